@@ -4,10 +4,17 @@ An autonomous agent that can use tools to accomplish tasks
 Architecture: Perceive → Plan → Act → Learn
 """
 
+import os
 import json
+import time
+import hashlib
+import inspect
 from datetime import datetime
-from typing import Dict, List, Callable, Any
+from typing import Dict, List, Callable, Any, Optional
 from enum import Enum
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from cache_utils import LRUCache
 
 class AgentStatus(Enum):
     THINKING = "thinking"
@@ -18,18 +25,33 @@ class AgentStatus(Enum):
 class Tool:
     """Base class for agent tools"""
     
-    def __init__(self, name: str, description: str, function: Callable):
+    def __init__(self, name: str, description: str, function: Callable, cacheable: bool = False):
         self.name = name
         self.description = description
         self.function = function
+        self.cacheable = cacheable  # Pure function of its inputs: results may be reused
     
     def execute(self, **kwargs) -> str:
         """Execute tool with given parameters"""
         try:
-            result = self.function(**kwargs)
-            return f"Tool {self.name} executed successfully: {result}"
+            return self.run(**kwargs)
         except Exception as e:
             return f"Error executing {self.name}: {str(e)}"
+    
+    def run(self, **kwargs) -> str:
+        """Execute tool, letting errors propagate"""
+        result = self.function(**kwargs)
+        return f"Tool {self.name} executed successfully: {result}"
+    
+    def cache_key(self, params: Dict) -> Optional[str]:
+        """Hash of tool name + parameters with defaults filled in (None if they don't bind)"""
+        try:
+            bound = inspect.signature(self.function).bind(**params)
+        except TypeError:
+            return None
+        bound.apply_defaults()
+        canonical = json.dumps(bound.arguments, sort_keys=True, default=str)
+        return hashlib.sha256(f"{self.name}\0{canonical}".encode("utf-8")).hexdigest()
 
 class PortfolioAgent:
     """Your first AI agent - can automate portfolio tasks"""
@@ -40,6 +62,12 @@ class PortfolioAgent:
         self.tools = self._register_tools()
         self.memory = []  # Agent's working memory
         self.max_steps = 5  # Prevent infinite loops
+        self.max_parallel = int(os.getenv("AGENT_MAX_PARALLEL", "4"))  # Concurrent tool calls
+        # Results of model-backed tools, reused for identical inputs
+        self.tool_cache = LRUCache(
+            maxsize=int(os.getenv("AGENT_TOOL_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("AGENT_TOOL_CACHE_TTL", "86400"))
+        )
         
     def _register_tools(self) -> Dict[str, Tool]:
         """Register all available tools for the agent"""
@@ -124,9 +152,9 @@ class PortfolioAgent:
         
         # Register all tools
         return {
-            "summarize": Tool("summarize", "Summarize any text", summarize_tool),
-            "analyze_code": Tool("analyze_code", "Analyze code for improvements", analyze_code_tool),
-            "generate_docs": Tool("generate_docs", "Generate documentation for code", generate_docs_tool),
+            "summarize": Tool("summarize", "Summarize any text", summarize_tool, cacheable=True),
+            "analyze_code": Tool("analyze_code", "Analyze code for improvements", analyze_code_tool, cacheable=True),
+            "generate_docs": Tool("generate_docs", "Generate documentation for code", generate_docs_tool, cacheable=True),
             "portfolio_stats": Tool("portfolio_stats", "Get portfolio statistics", portfolio_stats_tool),
             "learning_tracker": Tool("learning_tracker", "Track learning progress", learning_tracker_tool)
         }
@@ -143,6 +171,8 @@ class PortfolioAgent:
         Break this task into steps. Each step should:
         1. Use ONE tool from above
         2. Specify the exact parameters
+        3. List in "depends_on" the step numbers that must finish first
+           (use [] when the step is independent; independent steps run in parallel)
         
         Respond in JSON format:
         {{
@@ -151,6 +181,7 @@ class PortfolioAgent:
                     "step": 1,
                     "tool": "tool_name",
                     "parameters": {{"param1": "value1"}},
+                    "depends_on": [],
                     "reason": "Why this step is needed"
                 }}
             ]
@@ -166,8 +197,8 @@ class PortfolioAgent:
         plan = json.loads(response.choices[0].message.content)
         return plan.get("steps", [])
     
-    def execute_plan(self, task: str) -> Dict[str, Any]:
-        """Execute the entire plan for a task"""
+    def execute_plan(self, task: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Execute the entire plan for a task (use_cache=False re-runs every tool)"""
         
         self.status = AgentStatus.THINKING
         self.memory.append(f"Starting task: {task}")
@@ -179,28 +210,15 @@ class PortfolioAgent:
             self.status = AgentStatus.ERROR
             return {"error": "Failed to create plan", "steps": []}
         
-        results = []
+        steps = steps[:self.max_steps]
+        self.status = AgentStatus.ACTING
+        started = time.perf_counter()
+        outcomes = self._run_steps(steps, started, use_cache)
         
-        # Execute each step
-        for i, step in enumerate(steps[:self.max_steps]):
-            self.status = AgentStatus.ACTING
-            step_num = i + 1
-            
-            tool_name = step.get("tool")
-            if tool_name not in self.tools:
-                results.append(f"Step {step_num}: Unknown tool '{tool_name}'")
-                continue
-            
-            # Execute tool
-            tool = self.tools[tool_name]
-            params = step.get("parameters", {})
-            
-            try:
-                result = tool.execute(**params)
-                results.append(f"Step {step_num}: {result}")
-                self.memory.append(f"Executed {tool_name}: {result[:100]}...")
-            except Exception as e:
-                results.append(f"Step {step_num}: Error - {str(e)}")
+        results = [f"Step {o['step']}: {o['result']}" for o in outcomes]
+        for o in outcomes:
+            if o["status"] == "completed":
+                self.memory.append(f"Executed {o['tool']}: {o['result'][:100]}...")
         
         self.status = AgentStatus.COMPLETED
         self.memory.append(f"Completed task: {task}")
@@ -210,9 +228,93 @@ class PortfolioAgent:
             "status": self.status.value,
             "steps_executed": len(results),
             "results": results,
+            "cache_hits": sum(1 for o in outcomes if o["cached"]),
+            "step_timings": [
+                {k: o[k] for k in ("step", "tool", "depends_on", "status", "cached", "started_ms", "duration_ms")}
+                for o in outcomes
+            ],
+            "total_duration_ms": round((time.perf_counter() - started) * 1000, 1),
             "agent_memory": self.memory[-5:]  # Last 5 entries
         }
     
+    def _run_steps(self, steps: List[Dict], started: float, use_cache: bool = True) -> List[Dict]:
+        """Run plan steps on a thread pool, each as soon as its dependencies finish"""
+        numbers = [step.get("step", i + 1) for i, step in enumerate(steps)]
+        if len(set(numbers)) != len(numbers):
+            numbers = list(range(1, len(steps) + 1))
+        known = set(numbers)
+        deps = {
+            # Ignore references to steps that don't exist (or to itself)
+            n: {d for d in (step.get("depends_on") or []) if d in known and d != n}
+            for n, step in zip(numbers, steps)
+        }
+        by_number = dict(zip(numbers, steps))
+        outcomes: Dict[Any, Dict] = {}
+        done = set()
+        
+        def run(number) -> Dict:
+            step = by_number[number]
+            tool_name = step.get("tool")
+            outcome = {
+                "step": number,
+                "tool": tool_name,
+                "depends_on": sorted(deps[number]),
+                "cached": False,
+                "started_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+            t0 = time.perf_counter()
+            if tool_name not in self.tools:
+                outcome.update(status="error", result=f"Unknown tool '{tool_name}'")
+            else:
+                outcome.update(self._call_tool(self.tools[tool_name], step.get("parameters", {}), use_cache))
+            outcome["duration_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            return outcome
+        
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as pool:
+            running = {}
+            pending = list(numbers)
+            while pending or running:
+                for number in [n for n in pending if deps[n] <= done]:
+                    pending.remove(number)
+                    running[pool.submit(run, number)] = number
+                
+                if not running:
+                    # Remaining steps wait on each other (cycle): report, don't hang
+                    for number in pending:
+                        outcomes[number] = {
+                            "step": number, "tool": by_number[number].get("tool"),
+                            "depends_on": sorted(deps[number]), "status": "error", "cached": False,
+                            "result": "Unresolvable step dependencies",
+                            "started_ms": None, "duration_ms": 0.0
+                        }
+                    break
+                
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    number = running.pop(future)
+                    outcomes[number] = future.result()
+                    done.add(number)
+        
+        return [outcomes[n] for n in numbers]
+    
+    def _call_tool(self, tool: Tool, params: Dict, use_cache: bool) -> Dict:
+        """Run one tool, serving cacheable tools from the result cache when possible"""
+        key = tool.cache_key(params) if tool.cacheable and use_cache else None
+        if key:
+            cached = self.tool_cache.get(key)
+            if cached is not None:
+                return {"status": "completed", "result": cached, "cached": True}
+        
+        try:
+            result = tool.run(**params)
+        except Exception as e:
+            return {"status": "error", "result": f"Error executing {tool.name}: {str(e)}"}
+        
+        # Only successful results are cached
+        if key:
+            self.tool_cache.set(key, result)
+        return {"status": "completed", "result": result}
+    
     def get_agent_status(self) -> Dict[str, Any]:
         """Get current agent status and capabilities"""
         return {
@@ -221,5 +323,6 @@ class PortfolioAgent:
             "memory_entries": len(self.memory),
             "recent_memory": self.memory[-3:] if self.memory else [],
             "max_steps": self.max_steps,
+            "tool_cache": self.tool_cache.get_stats(),
             "timestamp": datetime.now().isoformat()
         }
\ No newline at end of file
@@ -0,0 +1,58 @@
+"""
+EMAIL TEMPLATE BENCHMARK - Per-render cost of the email bodies
+Compares a cold render (template substitution + fragment building)
+with a render-cache hit for the same payload
+
+Run (from Backend/):
+    python -m benchmarks.bench_email_templates --steps 20 --number 20000
+"""
+
+import argparse
+import timeit
+
+from email_templates import renderer
+from email_service import email_service
+
+
+def bench(label: str, func, number: int):
+    seconds = min(timeit.repeat(func, number=number, repeat=3))
+    print(f"  {label:<28} {seconds / number * 1e6:8.2f} µs/render")
+
+
+def run(steps: int, number: int):
+    summary = {
+        "chat_count": 12,
+        "agent_tasks": 3,
+        "memory_entries": 240,
+        "ai_summary": "Most questions were about the RAG project & the n8n <automation> setup.",
+        "recent_activities": [f"Activity {i}" for i in range(8)]
+    }
+    report = {
+        "task": "Summarize yesterday's portfolio activity",
+        "status": "completed",
+        "steps_executed": steps,
+        "results": [f"Step {i}: tool output with <markup> & text" for i in range(steps)]
+    }
+    renders = [
+        ("summary html", lambda: email_service._create_summary_html(summary)),
+        ("summary text", lambda: email_service._create_summary_text(summary)),
+        (f"agent report html ({steps} steps)", lambda: email_service._create_agent_report_html(report)),
+        (f"agent report text ({steps} steps)", lambda: email_service._create_agent_report_text(report)),
+    ]
+
+    print("cold (render cache cleared every call)")
+    for label, func in renders:
+        bench(label, lambda: (renderer.cache.clear(), func()), number)
+
+    print("cached (same payload)")
+    for label, func in renders:
+        func()
+        bench(label, func, number)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=20, help="agent steps in the report payload")
+    parser.add_argument("--number", type=int, default=20000, help="renders per timing run")
+    args = parser.parse_args()
+    run(args.steps, args.number)
@@ -0,0 +1,70 @@
+"""
+VECTOR INDEX BENCHMARK - Exact vs IVF search over synthetic embeddings
+Clustered unit vectors (like real embeddings, unlike uniform noise);
+queries are perturbed stored vectors. Reports per-query latency and
+recall@k against brute force for several nprobe values.
+
+Run (from Backend/):
+    python -m benchmarks.bench_vector_index --sizes 10000,100000,1000000 --dim 256
+Real embeddings are 1536-d; 1M x 1536 float32 needs ~6 GB of RAM.
+"""
+
+import time
+import argparse
+import numpy as np
+
+from vector_index import IVFIndex
+
+
+def make_vectors(rng, count: int, dim: int, clusters: int, chunk: int = 100000):
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    for start in range(0, count, chunk):
+        size = min(chunk, count - start)
+        noise = rng.standard_normal((size, dim)).astype(np.float32)
+        yield centers[rng.integers(0, clusters, size)] + 0.5 * noise
+
+
+def per_query_ms(search, queries) -> float:
+    started = time.perf_counter()
+    for q in queries:
+        search(q)
+    return (time.perf_counter() - started) / len(queries) * 1000
+
+
+def run(size: int, dim: int, queries: int, top_k: int, nprobes):
+    rng = np.random.default_rng(size)
+    index = IVFIndex(dim=dim, train_size=size, initial_capacity=size)
+
+    started = time.perf_counter()
+    for chunk in make_vectors(rng, size, dim, clusters=max(size // 500, 16)):
+        index.add_batch(chunk)  # Starts training once the last chunk arrives
+    index.wait_for_training()
+    build = time.perf_counter() - started
+
+    picks = rng.integers(0, size, queries)
+    probes = index.vectors[picks] + 0.05 * rng.standard_normal((queries, dim)).astype(np.float32)
+    exact = [{p for p, _ in index.flat.search(q, top_k)} for q in probes]
+
+    stats = index.get_stats()
+    print(f"{size:,} vectors x {dim}d  (nlist {stats['nlist']}, largest list {stats['largest_list']}, "
+          f"train + file {build:.1f}s)")
+    brute = per_query_ms(lambda q: index.flat.search(q, top_k), probes)
+    print(f"  {'brute force':<14} {brute:8.3f} ms/query  recall@{top_k} 1.000")
+    for nprobe in nprobes:
+        latency = per_query_ms(lambda q: index.search(q, top_k, nprobe), probes)
+        found = sum(len(truth & {p for p, _ in index.search(q, top_k, nprobe)})
+                    for truth, q in zip(exact, probes))
+        print(f"  {'ivf nprobe=' + str(nprobe):<14} {latency:8.3f} ms/query  "
+              f"recall@{top_k} {found / (top_k * queries):.3f}  ({brute / latency:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated vector counts")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nprobe", default="1,4,8,16,32", help="comma-separated nprobe values")
+    args = parser.parse_args()
+    for size in (int(s) for s in args.sizes.split(",")):
+        run(size, args.dim, args.queries, args.top_k, [int(n) for n in args.nprobe.split(",")])
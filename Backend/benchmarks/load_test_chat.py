@@ -0,0 +1,52 @@
+"""
+CHAT LOAD TEST - Concurrent requests against /chat or /chat_smart
+Pair with benchmarks/mock_openai.py so no real API calls are made
+
+Run (from Backend/):
+    python -m benchmarks.load_test_chat --endpoint /chat_smart --requests 200 --concurrency 50
+"""
+
+import time
+import asyncio
+import argparse
+import statistics
+import httpx
+
+
+async def run(base_url: str, endpoint: str, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        async def one(i: int):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    f"{endpoint}?session_id=load_{i % concurrency}",
+                    json={"content": f"Load test question number {i} about your projects"}
+                )
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{endpoint}: {total} requests, concurrency {concurrency}, {errors} errors")
+    print(f"  wall time   {elapsed:.2f}s  ({total / elapsed:.1f} req/s)")
+    print(f"  latency p50 {statistics.median(latencies) * 1000:.0f}ms  "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f}ms  "
+          f"max {latencies[-1] * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", default="/chat")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.endpoint, args.requests, args.concurrency))
@@ -0,0 +1,115 @@
+"""
+MOCK OPENAI API - Local load-testing stand-in
+Implements the two endpoints the backend calls with a fixed artificial latency
+
+Run:
+    MOCK_LATENCY_MS=800 uvicorn benchmarks.mock_openai:app --port 9000
+Then start the backend against it:
+    OPENAI_BASE_URL=http://localhost:9000/v1 OPENAI_API_KEY=mock uvicorn main:app
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import numpy as np
+import json
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="Mock OpenAI")
+
+LATENCY = float(os.getenv("MOCK_LATENCY_MS", "500")) / 1000
+TOKEN_DELAY = float(os.getenv("MOCK_TOKEN_DELAY_MS", "20")) / 1000
+EMBEDDING_DIM = int(os.getenv("MOCK_EMBEDDING_DIM", "1536"))
+
+# Prompt prefixes seen so far, to mimic provider prefix caching
+# (cache hits start at 1024 tokens and grow in 128-token steps; ~4 chars/token)
+_seen_prefixes = set()
+
+
+def fake_usage(messages: list, reply: str) -> dict:
+    prompt = json.dumps(messages)
+    prompt_tokens = len(prompt) // 4
+    cached = 0
+    for end in range(len(prompt) // 512 * 512, 4096 - 1, -512):
+        if hashlib.sha256(prompt[:end].encode()).digest() in _seen_prefixes:
+            cached = end // 4
+            break
+    for end in range(4096, len(prompt) + 1, 512):
+        _seen_prefixes.add(hashlib.sha256(prompt[:end].encode()).digest())
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": len(reply) // 4,
+        "total_tokens": prompt_tokens + len(reply) // 4,
+        "prompt_tokens_details": {"cached_tokens": cached}
+    }
+
+
+def fake_embedding(text: str) -> list:
+    """Deterministic pseudo-random vector so identical text embeds identically"""
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+    return np.random.default_rng(seed).normal(size=EMBEDDING_DIM).astype(np.float32).tolist()
+
+
+async def stream_chunks(model: str, reply: str, usage: dict = None):
+    """SSE chunks in the shape the SDK expects for stream=True"""
+    chunk_id = f"chatcmpl-mock-{time.time_ns()}"
+    await asyncio.sleep(LATENCY)
+    for word in reply.split(" "):
+        chunk = {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(TOKEN_DELAY)
+    if usage:
+        chunk = {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                 "model": model, "choices": [], "usage": usage}
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: dict):
+    last = body.get("messages", [{}])[-1].get("content", "")
+    reply = f"Mock reply to: {last[:80]}"
+    usage = fake_usage(body.get("messages", []), reply)
+    if body.get("stream"):
+        include_usage = (body.get("stream_options") or {}).get("include_usage")
+        return StreamingResponse(stream_chunks(body.get("model", "mock"), reply, usage if include_usage else None),
+                                 media_type="text/event-stream")
+
+    await asyncio.sleep(LATENCY)
+    return {
+        "id": f"chatcmpl-mock-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": reply},
+            "finish_reason": "stop"
+        }],
+        "usage": usage
+    }
+
+
+@app.post("/v1/embeddings")
+async def embeddings(body: dict):
+    await asyncio.sleep(LATENCY / 5)
+    inputs = body.get("input", "")
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    return {
+        "object": "list",
+        "model": body.get("model", "mock"),
+        "data": [
+            {"object": "embedding", "index": i, "embedding": fake_embedding(text)}
+            for i, text in enumerate(inputs)
+        ],
+        "usage": {"prompt_tokens": 8, "total_tokens": 8}
+    }
@@ -0,0 +1,145 @@
+"""
+CONVERSATION SUMMARY - Rolling compaction of long sessions
+Messages trimmed from ConversationMemory are folded into one summary per
+session instead of being dropped
+- Runs as a background task, never on the request path
+- Batched: a session is summarized once SUMMARY_BATCH_MESSAGES evicted
+  messages are waiting, or SUMMARY_MAX_DELAY seconds after the first one,
+  so the summary (a prompt prefix) changes rarely; until then the waiting
+  messages are still sent as history (see pending())
+- Waiting messages live in the ConversationStore, not in this process: they
+  survive restarts, are visible to every worker, and are deleted in the same
+  transaction that commits the summary covering them
+- At most one summarization in flight per session per process; across
+  workers the store's compare-and-set commit keeps the first one
+"""
+
+import os
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from storage import ConversationStore
+
+
+SUMMARY_INSTRUCTIONS = """You maintain a running summary of a conversation between a visitor and an AI portfolio assistant.
+Merge the new messages into the existing summary. Keep facts the visitor shared, their questions and interests,
+and anything the assistant promised or recommended. Drop greetings and small talk.
+Write at most {max_words} words of plain prose."""
+
+
+class ConversationSummarizer:
+    """Folds evicted messages into a per-session rolling summary"""
+
+    def __init__(self, store: ConversationStore, llm, model: str = "gpt-4o-mini",
+                 max_tokens: int = None, batch_size: int = None, max_delay: float = None):
+        self.store = store
+        self.llm = llm
+        self.model = model
+        self.max_tokens = max_tokens or int(os.getenv("SUMMARY_MAX_TOKENS", "200"))
+        self.batch_size = batch_size or int(os.getenv("SUMMARY_BATCH_MESSAGES", "12"))
+        self.max_delay = max_delay or float(os.getenv("SUMMARY_MAX_DELAY", "600"))
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self.runs = 0
+        self.conflicts = 0
+        self.failures = 0
+
+    def get_summary(self, session_id: str) -> Optional[Dict]:
+        return self.store.get_summary(session_id)
+
+    def pending(self, session_id: str) -> List[Dict]:
+        """Evicted messages not yet in the summary, oldest first"""
+        return self.store.get_pending(session_id)
+
+    def schedule(self, session_id: str, pending: int):
+        """Note that `pending` evicted messages are waiting; call from the event loop"""
+        if pending:
+            self._arm(session_id, pending)
+
+    def _arm(self, session_id: str, pending: int):
+        """Summarize now if a full batch is waiting, else make sure a timer is set"""
+        if session_id in self._tasks:
+            return
+        if pending >= self.batch_size:
+            self._start(session_id)
+        elif session_id not in self._timers:
+            self._delay(session_id)
+
+    def _delay(self, session_id: str):
+        loop = asyncio.get_running_loop()
+        self._timers[session_id] = loop.call_later(self.max_delay, self._start, session_id)
+
+    def _start(self, session_id: str):
+        timer = self._timers.pop(session_id, None)
+        if timer:
+            timer.cancel()
+        if session_id not in self._tasks:
+            self._tasks[session_id] = asyncio.create_task(self._drain(session_id))
+
+    async def _drain(self, session_id: str):
+        failed = False
+        remaining = 0
+        try:
+            batch = await run_in_threadpool(self.store.get_pending, session_id)
+            if batch:
+                if await self._fold(session_id, batch):
+                    self.runs += 1
+                else:
+                    self.conflicts += 1
+            # Evictions that arrived during the call are still in the store
+            remaining = len(await run_in_threadpool(self.store.get_pending, session_id))
+        except Exception:
+            # Messages stay in the store; retry after max_delay, not immediately
+            self.failures += 1
+            failed = True
+        finally:
+            self._tasks.pop(session_id, None)
+            if failed:
+                self._delay(session_id)
+            elif remaining:
+                self._arm(session_id, remaining)
+
+    async def _fold(self, session_id: str, messages: List[Dict]) -> bool:
+        """Summarize messages into the session summary; False if another worker got there first"""
+        previous = await run_in_threadpool(self.store.get_summary, session_id)
+        transcript = "\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in messages)
+        prompt = f"Existing summary:\n{previous['text'] if previous else '(none)'}\n\nNew messages:\n{transcript}"
+
+        response = await self.llm.chat(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SUMMARY_INSTRUCTIONS.format(max_words=self.max_tokens * 3 // 4)},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=self.max_tokens,
+            temperature=0.3
+        )
+        summary = {
+            "text": response.choices[0].message.content.strip(),
+            "messages": (previous["messages"] if previous else 0) + len(messages),
+            "updated": datetime.now().isoformat()
+        }
+        return await run_in_threadpool(self.store.commit_summary, session_id, summary, len(messages))
+
+    async def flush(self):
+        """Summarize everything this process has waiting and wait for it (e.g. on shutdown)"""
+        # Second pass picks up partial batches left behind by full-batch runs
+        for _ in range(2):
+            for session_id in list(self._timers):
+                self._start(session_id)
+            if self._tasks:
+                await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    def get_stats(self) -> Dict:
+        return {
+            "runs": self.runs,
+            "conflicts": self.conflicts,
+            "failures": self.failures,
+            "in_flight": len(self._tasks),
+            "waiting_sessions": len(self._timers),
+            "batch_size": self.batch_size,
+            "max_tokens": self.max_tokens
+        }
@@ -1,21 +1,326 @@
 """
 EMAIL SERVICE - Day 7
 Send professional emails with HTML templates
+Delivery goes through an in-process outbox so request handlers only enqueue
 """
 
 import os
 import json
-from datetime import datetime
-from typing import Dict, List, Optional
+import glob
+import uuid
+import heapq
+import random
+import bisect
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
 from dotenv import load_dotenv
+from fastapi import APIRouter, Header, HTTPException
 import logging
 
+from email_templates import SafeHTML, escape, renderer
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+
+class EmailLog:
+    """
+    Append-only JSON-lines log of sent emails
+    - Appends write one line; nothing is ever rewritten
+    - In-memory (timestamp, byte offset) index, so a time-range query
+      seeks to the first match and parses only the lines it returns
+    - The index is built by reading the file itself: bytes past the last
+      indexed offset are indexed before every append and query, so lines
+      written by other uvicorn workers are picked up too
+    """
+    
+    def __init__(self, log_file: str = "logs/email_log.jsonl"):
+        self.log_file = log_file
+        self._times: List[str] = []
+        self._offsets: List[int] = []
+        self._size = 0  # Bytes indexed so far (always ends on a line boundary)
+        self._lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        if not os.path.exists(log_file):
+            self._migrate_daily_json()
+        self._build_index()
+    
+    def _migrate_daily_json(self):
+        """Fold the old logs/email_log_YYYYMMDD.json arrays into the JSONL log"""
+        legacy_files = sorted(glob.glob(os.path.join(os.path.dirname(self.log_file) or ".", "email_log_*.json")))
+        if not legacy_files:
+            return
+        with open(self.log_file, 'w') as out:
+            for legacy_file in legacy_files:
+                try:
+                    with open(legacy_file, 'r') as f:
+                        entries = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    continue
+                for entry in entries:
+                    out.write(json.dumps(entry) + "\n")
+    
+    def _build_index(self):
+        self._catch_up()
+        if os.path.exists(self.log_file) and self._size != os.path.getsize(self.log_file):
+            # Drop the partial line so new appends start clean
+            with open(self.log_file, 'r+b') as f:
+                f.truncate(self._size)
+    
+    def _catch_up(self):
+        """Index complete lines past _size, whoever wrote them (call with the lock held)"""
+        if not os.path.exists(self.log_file):
+            return
+        with open(self.log_file, 'rb') as f:
+            f.seek(self._size)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Torn, or another process is still writing it
+                try:
+                    timestamp = json.loads(line)["timestamp"]
+                except (ValueError, KeyError):
+                    timestamp = None
+                if timestamp:
+                    # Clamp so the index stays sorted if clocks disagree or step backwards
+                    self._times.append(max(timestamp, self._times[-1]) if self._times else timestamp)
+                    self._offsets.append(self._size)
+                self._size += len(line)
+    
+    def append(self, entry: Dict):
+        """Add one entry"""
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        with self._lock:
+            # One O_APPEND write, so lines from several processes never interleave
+            with open(self.log_file, 'ab') as f:
+                f.write(line)
+            self._catch_up()
+    
+    def query(self, since: Optional[str] = None, until: Optional[str] = None,
+              email_type: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Entries with since <= timestamp < until (ISO strings), oldest first"""
+        with self._lock:
+            self._catch_up()
+            start = bisect.bisect_left(self._times, since) if since else 0
+            end = bisect.bisect_left(self._times, until) if until else len(self._times)
+            if start >= end:
+                return []
+            begin = self._offsets[start]
+            stop = self._offsets[end] if end < len(self._offsets) else self._size
+        
+        with open(self.log_file, 'rb') as f:
+            f.seek(begin)
+            chunk = f.read(stop - begin)
+        
+        entries = []
+        for line in chunk.splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if email_type and entry.get("type") != email_type:
+                continue
+            entries.append(entry)
+        return entries[-limit:] if limit else entries
+    
+    def __len__(self) -> int:
+        return len(self._times)
+
+
+class EmailOutbox:
+    """
+    Background sender for outgoing email
+    - Identical messages to different recipients go out as one batch
+    - Failed batches are retried with exponential backoff, then handed to a fallback
+    - An idempotency key returns the original message instead of queueing a duplicate
+    """
+    
+    def __init__(self, deliver: Callable, fallback: Callable, batch_size: int = 50,
+                 max_attempts: int = 4, backoff: float = 2.0, max_messages: int = 1000):
+        # deliver(recipients, subject, html, text) -> one result dict for the whole
+        # batch, or a list with one result per recipient (same order)
+        self.deliver = deliver
+        self.fallback = fallback  # fallback(message, error) -> result dict
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_messages = max_messages  # Finished messages kept for status lookups
+        self._pending = deque()
+        self._retries: List = []  # heap of (due_timestamp, sequence, message)
+        self._sequence = 0
+        self._messages: "OrderedDict[str, Dict]" = OrderedDict()
+        self._idempotency: Dict[str, str] = {}
+        self._events: Dict[str, threading.Event] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.sent = 0
+        self.retried = 0
+        self.fallbacks = 0
+    
+    def enqueue(self, to_email: str, subject: str, html_content: str, text_content: str,
+                idempotency_key: Optional[str] = None, on_done: Callable = None) -> Dict:
+        """Queue one message, returns its status record immediately"""
+        with self._condition:
+            if idempotency_key and idempotency_key in self._idempotency:
+                existing = self._messages.get(self._idempotency[idempotency_key])
+                if existing:
+                    return self._public(existing)
+            
+            message = {
+                "message_id": uuid.uuid4().hex,
+                "to": to_email,
+                "subject": subject,
+                "html": html_content,
+                "text": text_content,
+                "status": "queued",
+                "attempts": 0,
+                "result": None,
+                "timestamp": datetime.now().isoformat(),
+                "idempotency_key": idempotency_key,
+                "on_done": on_done
+            }
+            self._messages[message["message_id"]] = message
+            self._events[message["message_id"]] = threading.Event()
+            if idempotency_key:
+                self._idempotency[idempotency_key] = message["message_id"]
+            self._pending.append(message)
+            self._condition.notify()
+        
+        self.start()
+        return self._public(message)
+    
+    def start(self):
+        """Start the sender thread (idempotent)"""
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+                self._thread.start()
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                now = datetime.now().timestamp()
+                while self._retries and self._retries[0][0] <= now:
+                    self._pending.append(heapq.heappop(self._retries)[2])
+                if not self._pending:
+                    timeout = self._retries[0][0] - now if self._retries else None
+                    self._condition.wait(timeout)
+                    continue
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            
+            # Group identical content so each group is one provider call
+            groups: Dict[tuple, List[Dict]] = {}
+            for message in batch:
+                groups.setdefault((message["subject"], message["html"], message["text"]), []).append(message)
+            for (subject, html_content, text_content), messages in groups.items():
+                self._send_group(messages, subject, html_content, text_content)
+    
+    def _send_group(self, messages: List[Dict], subject: str, html_content: str, text_content: str):
+        for message in messages:
+            message["status"] = "sending"
+            message["attempts"] += 1
+        try:
+            result = self.deliver([m["to"] for m in messages], subject, html_content, text_content)
+        except Exception as e:
+            logger.error(f"Email delivery failed ({len(messages)} recipients): {e}")
+            for message in messages:
+                self._retry_or_fallback(message, e)
+            return
+        
+        results = result if isinstance(result, list) else [result] * len(messages)
+        for message, message_result in zip(messages, results):
+            self._finish(message, message_result)
+        self.sent += len(messages)
+    
+    def _retry_or_fallback(self, message: Dict, error: Exception):
+        if message["attempts"] < self.max_attempts:
+            delay = self.backoff * 2 ** (message["attempts"] - 1) * random.uniform(0.8, 1.2)
+            message["status"] = "retrying"
+            message["last_error"] = str(error)
+            self.retried += 1
+            with self._condition:
+                self._sequence += 1
+                heapq.heappush(self._retries, (datetime.now().timestamp() + delay, self._sequence, message))
+                self._condition.notify()
+            return
+        
+        try:
+            result = self.fallback(message, error)
+        except Exception as e:
+            result = {"status": "failed", "error": str(e), "timestamp": datetime.now().isoformat()}
+        self.fallbacks += 1
+        self._finish(message, result)
+    
+    def _finish(self, message: Dict, result: Dict):
+        message["result"] = result
+        message["status"] = result.get("status", "sent")
+        # Bodies are only needed until delivery
+        message["html"] = message["text"] = None
+        
+        if message["on_done"]:
+            try:
+                message["on_done"](self._public(message))
+            except Exception as e:
+                logger.error(f"Email completion callback failed: {e}")
+        
+        with self._condition:
+            event = self._events.pop(message["message_id"], None)
+            self._forget_old_messages()
+        if event:
+            event.set()
+    
+    def _forget_old_messages(self):
+        finished = [mid for mid, m in self._messages.items() if m["result"] is not None]
+        for message_id in finished[:max(len(finished) - self.max_messages, 0)]:
+            message = self._messages.pop(message_id)
+            if message["idempotency_key"]:
+                self._idempotency.pop(message["idempotency_key"], None)
+    
+    @staticmethod
+    def _public(message: Dict) -> Dict:
+        record = {
+            "message_id": message["message_id"],
+            "status": message["status"],
+            "to": message["to"],
+            "subject": message["subject"],
+            "attempts": message["attempts"],
+            "timestamp": message["timestamp"]
+        }
+        if message["result"]:
+            record.update({k: v for k, v in message["result"].items() if k != "timestamp"})
+            record["status"] = message["status"]
+        return record
+    
+    def get(self, message_id: str) -> Optional[Dict]:
+        with self._condition:
+            message = self._messages.get(message_id)
+            return self._public(message) if message else None
+    
+    def wait(self, message_id: str, timeout: float) -> Optional[Dict]:
+        """Block until the message is delivered (or handed to the fallback)"""
+        with self._condition:
+            event = self._events.get(message_id)
+        if event:
+            event.wait(timeout)
+        return self.get(message_id)
+    
+    def get_stats(self) -> Dict:
+        with self._condition:
+            return {
+                "pending": len(self._pending),
+                "retrying": len(self._retries),
+                "sent": self.sent,
+                "retried": self.retried,
+                "fallbacks": self.fallbacks
+            }
+
+
 class EmailService:
     """Email service with SendGrid integration and fallback"""
     
@@ -23,6 +328,15 @@ class EmailService:
         self.api_key = os.getenv("SENDGRID_API_KEY")
         self.email_from = os.getenv("EMAIL_FROM", "portfolio@example.com")
         self.email_to = os.getenv("EMAIL_TO", "user@example.com")
+        self.email_log = EmailLog(os.getenv("EMAIL_LOG_FILE", "logs/email_log.jsonl"))
+        
+        # Outgoing mail is queued and sent by a background thread
+        self.outbox = EmailOutbox(
+            deliver=self._send_email,
+            fallback=self._fallback_to_file,
+            batch_size=int(os.getenv("EMAIL_BATCH_SIZE", "50")),
+            max_attempts=int(os.getenv("EMAIL_MAX_ATTEMPTS", "4"))
+        )
         
         # Initialize SendGrid client if API key exists
         self.sendgrid_client = None
@@ -37,8 +351,8 @@ class EmailService:
         else:
             logger.warning("⚠️ No SendGrid API key found. Using file logging.")
     
-    def send_portfolio_summary(self, summary_data: Dict) -> Dict:
-        """Send portfolio summary email"""
+    def send_portfolio_summary(self, summary_data: Dict, idempotency_key: Optional[str] = None) -> Dict:
+        """Queue portfolio summary email"""
         
         # Create email content
         subject = f"📊 AI Portfolio Summary - {datetime.now().strftime('%Y-%m-%d')}"
@@ -47,21 +361,12 @@ class EmailService:
         html_content = self._create_summary_html(summary_data)
         text_content = self._create_summary_text(summary_data)
         
-        # Send email
-        result = self._send_email(
-            to_email=self.email_to,
-            subject=subject,
-            html_content=html_content,
-            text_content=text_content
-        )
-        
-        # Log the email
-        self._log_email_sent(summary_data, result)
-        
-        return result
+        # Queue email, logged once delivery settles
+        return self._enqueue(subject, html_content, text_content, idempotency_key,
+                             log_data=summary_data, email_type="portfolio_summary")
     
-    def send_daily_report(self, agent_results: Dict) -> Dict:
-        """Send daily AI agent execution report"""
+    def send_daily_report(self, agent_results: Dict, idempotency_key: Optional[str] = None) -> Dict:
+        """Queue daily AI agent execution report"""
         
         subject = f"🤖 AI Agent Daily Report - {datetime.now().strftime('%Y-%m-%d')}"
         
@@ -69,48 +374,59 @@ class EmailService:
         html_content = self._create_agent_report_html(agent_results)
         text_content = self._create_agent_report_text(agent_results)
         
-        result = self._send_email(
-            to_email=self.email_to,
+        return self._enqueue(subject, html_content, text_content, idempotency_key,
+                             log_data=agent_results, email_type="agent_report")
+    
+    def _enqueue(self, subject: str, html_content: str, text_content: str,
+                 idempotency_key: Optional[str], log_data: Dict, email_type: str) -> Dict:
+        """One message per EMAIL_TO recipient (comma-separated); identical ones batch together"""
+        recipients = [e.strip() for e in self.email_to.split(",") if e.strip()]
+        records = []
+        for to_email in recipients:
+            key = f"{idempotency_key}:{to_email}" if idempotency_key else None
+            records.append(self.outbox.enqueue(
+                to_email, subject, html_content, text_content, key,
+                on_done=lambda record: self._log_email_sent(log_data, record, email_type=email_type)
+            ))
+        return records[0] if len(records) == 1 else {"status": "queued", "messages": records}
+    
+    def _send_email(self, to_emails: List[str], subject: str, 
+                   html_content: str, text_content: str):
+        """Send one email to each recipient using SendGrid (raises so the outbox retries)"""
+        
+        # Without SendGrid: save to file (for development), one file and result per recipient
+        if not self.sendgrid_client:
+            return [self._save_email_to_file(to_email, subject, html_content) for to_email in to_emails]
+        
+        from sendgrid.helpers.mail import Mail, Content, To, From
+        
+        # is_multiple: one personalization per recipient, so nobody sees the others
+        message = Mail(
+            from_email=From(self.email_from, "AI Portfolio"),
+            to_emails=[To(to_email) for to_email in to_emails],
             subject=subject,
-            html_content=html_content,
-            text_content=text_content
+            html_content=Content("text/html", html_content),
+            plain_text_content=Content("text/plain", text_content),
+            is_multiple=True
         )
         
-        return result
-    
-    def _send_email(self, to_email: str, subject: str, 
-                   html_content: str, text_content: str) -> Dict:
-        """Send email using SendGrid or fallback"""
-        
-        # Try SendGrid if available
-        if self.sendgrid_client:
-            try:
-                from sendgrid.helpers.mail import Mail, Content, To, From
-                
-                message = Mail(
-                    from_email=From(self.email_from, "AI Portfolio"),
-                    to_emails=To(to_email),
-                    subject=subject,
-                    html_content=Content("text/html", html_content),
-                    plain_text_content=Content("text/plain", text_content)
-                )
-                
-                response = self.sendgrid_client.send(message)
-                
-                return {
-                    "status": "sent",
-                    "service": "sendgrid",
-                    "status_code": response.status_code,
-                    "message_id": response.headers.get('X-Message-Id'),
-                    "timestamp": datetime.now().isoformat()
-                }
-                
-            except Exception as e:
-                logger.error(f"SendGrid error: {e}")
-                # Fall through to file logging
+        response = self.sendgrid_client.send(message)
+        if response.status_code >= 300:
+            raise Exception(f"SendGrid returned {response.status_code}")
         
-        # Fallback: Save to file (for development)
-        return self._save_email_to_file(to_email, subject, html_content)
+        return {
+            "status": "sent",
+            "service": "sendgrid",
+            "status_code": response.status_code,
+            "provider_message_id": response.headers.get('X-Message-Id'),
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def _fallback_to_file(self, message: Dict, error: Exception) -> Dict:
+        """Keep the email on disk when SendGrid keeps failing"""
+        result = self._save_email_to_file(message["to"], message["subject"], message["html"])
+        result["error"] = str(error)
+        return result
     
     def _save_email_to_file(self, to_email: str, subject: str, 
                            html_content: str) -> Dict:
@@ -124,9 +440,9 @@ class EmailService:
             "saved_to_file": True
         }
         
-        # Save to emails directory
+        # Save to emails directory (suffix keeps same-second emails apart)
         os.makedirs("emails", exist_ok=True)
-        filename = f"emails/email_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        filename = f"emails/email_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.json"
         
         with open(filename, 'w') as f:
             json.dump(email_data, f, indent=2)
@@ -142,207 +458,141 @@ class EmailService:
     
     def _create_summary_html(self, data: Dict) -> str:
         """Create HTML email template for portfolio summary"""
-        
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: linear-gradient(135deg, #4361ee, #3a0ca3); color: white; padding: 30px; border-radius: 10px 10px 0 0; text-align: center; }}
-                .content {{ background: #f8f9fa; padding: 30px; border-radius: 0 0 10px 10px; }}
-                .stats {{ display: grid; grid-template-columns: repeat(3, 1fr); gap: 15px; margin: 20px 0; }}
-                .stat-box {{ background: white; padding: 15px; border-radius: 8px; text-align: center; box-shadow: 0 2px 5px rgba(0,0,0,0.1); }}
-                .stat-value {{ font-size: 24px; font-weight: bold; color: #4361ee; }}
-                .stat-label {{ font-size: 12px; color: #666; margin-top: 5px; }}
-                .section {{ margin: 25px 0; }}
-                .ai-message {{ background: #e3f2fd; padding: 15px; border-radius: 8px; border-left: 4px solid #4361ee; }}
-                .footer {{ margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; font-size: 12px; color: #666; text-align: center; }}
-                .btn {{ display: inline-block; background: #4361ee; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; margin: 10px 0; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>🤖 AI Portfolio Summary</h1>
-                <p>{datetime.now().strftime('%B %d, %Y')}</p>
-            </div>
-            
-            <div class="content">
-                <div class="section">
-                    <h2>📊 Daily Overview</h2>
-                    <p>Your AI-powered portfolio had activity today. Here's what happened:</p>
-                    
-                    <div class="stats">
-                        <div class="stat-box">
-                            <div class="stat-value">{data.get('chat_count', 0)}</div>
-                            <div class="stat-label">Chats Today</div>
-                        </div>
-                        <div class="stat-box">
-                            <div class="stat-value">{data.get('agent_tasks', 0)}</div>
-                            <div class="stat-label">Agent Tasks</div>
-                        </div>
-                        <div class="stat-box">
-                            <div class="stat-value">{data.get('memory_entries', 0)}</div>
-                            <div class="stat-label">Memory Entries</div>
-                        </div>
-                    </div>
-                </div>
-                
-                <div class="section">
-                    <h2>🤖 AI Insights</h2>
-                    <div class="ai-message">
-                        <p>{data.get('ai_summary', 'Your AI assistant has been processing requests and learning from interactions.')}</p>
-                    </div>
-                </div>
-                
-                <div class="section">
-                    <h2>🚀 Recent Activity</h2>
-                    <ul>
-                        {self._format_activities(data.get('recent_activities', []))}
-                    </ul>
-                </div>
-                
-                <div class="section">
-                    <h2>🎯 What's Next?</h2>
-                    <p>Based on your learning patterns, consider exploring:</p>
-                    <ul>
-                        <li><strong>AI Agents:</strong> Extend your agent with new tools</li>
-                        <li><strong>Automation:</strong> Add more n8n workflows</li>
-                        <li><strong>Frontend:</strong> Enhance the dashboard with charts</li>
-                    </ul>
-                </div>
-                
-                <a href="http://localhost:8080" class="btn">View Live Portfolio</a>
-                
-                <div class="footer">
-                    <p>This email was automatically generated by your AI Portfolio system.</p>
-                    <p>You're receiving this because you enabled daily summaries.</p>
-                    <p><a href="http://localhost:8080#settings" style="color: #4361ee;">Adjust email settings</a></p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        payload = {"data": data, "date": datetime.now().strftime('%B %d, %Y')}
+        return renderer.render("summary_html", payload, lambda p: {
+            "date": p["date"],
+            "chat_count": p["data"].get('chat_count', 0),
+            "agent_tasks": p["data"].get('agent_tasks', 0),
+            "memory_entries": p["data"].get('memory_entries', 0),
+            "ai_summary": p["data"].get('ai_summary', 'Your AI assistant has been processing requests and learning from interactions.'),
+            "activities": self._format_activities(p["data"].get('recent_activities', []))
+        })
     
-    def _format_activities(self, activities: List[str]) -> str:
+    def _format_activities(self, activities: List[str]) -> SafeHTML:
         """Format activities list as HTML"""
         if not activities:
-            return "<li>No recent activities recorded.</li>"
+            return SafeHTML("<li>No recent activities recorded.</li>")
         
-        items = ""
-        for activity in activities[:5]:  # Last 5 activities
-            items += f"<li>{activity}</li>"
-        return items
+        # Last 5 activities
+        return SafeHTML("".join(f"<li>{escape(activity)}</li>" for activity in activities[:5]))
     
     def _create_summary_text(self, data: Dict) -> str:
         """Create plain text version of summary"""
-        return f"""
-        AI Portfolio Summary - {datetime.now().strftime('%Y-%m-%d')}
-        
-        Daily Overview:
-        - Chats Today: {data.get('chat_count', 0)}
-        - Agent Tasks: {data.get('agent_tasks', 0)}
-        - Memory Entries: {data.get('memory_entries', 0)}
-        
-        AI Insights:
-        {data.get('ai_summary', 'Your AI assistant has been processing requests.')}
-        
-        View your portfolio: http://localhost:8080
-        
-        This email was automatically generated by your AI Portfolio system.
-        """
+        payload = {"data": data, "date": datetime.now().strftime('%Y-%m-%d')}
+        return renderer.render("summary_text", payload, lambda p: {
+            "date": p["date"],
+            "chat_count": p["data"].get('chat_count', 0),
+            "agent_tasks": p["data"].get('agent_tasks', 0),
+            "memory_entries": p["data"].get('memory_entries', 0),
+            "ai_summary": p["data"].get('ai_summary', 'Your AI assistant has been processing requests.')
+        })
     
     def _create_agent_report_html(self, agent_results: Dict) -> str:
         """Create HTML report for agent execution"""
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: linear-gradient(135deg, #28a745, #20c997); color: white; padding: 30px; border-radius: 10px 10px 0 0; text-align: center; }}
-                .content {{ background: #f8f9fa; padding: 30px; border-radius: 0 0 10px 10px; }}
-                .step {{ background: white; padding: 15px; margin: 10px 0; border-radius: 8px; border-left: 4px solid #28a745; }}
-                .success {{ color: #28a745; }}
-                .error {{ color: #dc3545; }}
-                .footer {{ margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; font-size: 12px; color: #666; text-align: center; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>🤖 AI Agent Execution Report</h1>
-                <p>{datetime.now().strftime('%B %d, %Y %H:%M')}</p>
-            </div>
-            
-            <div class="content">
-                <h2>Task: {agent_results.get('task', 'Unknown')}</h2>
-                <p><strong>Status:</strong> <span class="{agent_results.get('status', '')}">{agent_results.get('status', '').upper()}</span></p>
-                <p><strong>Steps Executed:</strong> {agent_results.get('steps_executed', 0)}</p>
-                
-                <h3>Execution Steps:</h3>
-                {self._format_agent_steps(agent_results.get('results', []))}
-                
-                <div class="footer">
-                    <p>This report was generated automatically by your AI Portfolio system.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        payload = {"data": agent_results, "date": datetime.now().strftime('%B %d, %Y %H:%M')}
+        return renderer.render("agent_report_html", payload, lambda p: {
+            "date": p["date"],
+            "task": p["data"].get('task', 'Unknown'),
+            "status": p["data"].get('status', ''),
+            "status_label": p["data"].get('status', '').upper(),
+            "steps_executed": p["data"].get('steps_executed', 0),
+            "steps": self._format_agent_steps(p["data"].get('results', []))
+        })
     
-    def _format_agent_steps(self, steps: List[str]) -> str:
+    def _format_agent_steps(self, steps: List[str]) -> SafeHTML:
         """Format agent steps as HTML"""
         if not steps:
-            return "<p>No steps were executed.</p>"
+            return SafeHTML("<p>No steps were executed.</p>")
         
-        html = ""
-        for i, step in enumerate(steps, 1):
-            html += f"""
+        return SafeHTML("".join(
+            f"""
             <div class="step">
-                <strong>Step {i}:</strong> {step}
+                <strong>Step {i}:</strong> {escape(step)}
             </div>
             """
-        return html
+            for i, step in enumerate(steps, 1)
+        ))
     
     def _create_agent_report_text(self, agent_results: Dict) -> str:
         """Create plain text agent report"""
-        return f"""
-        AI Agent Execution Report
-        
-        Task: {agent_results.get('task', 'Unknown')}
-        Status: {agent_results.get('status', 'unknown')}
-        Steps Executed: {agent_results.get('steps_executed', 0)}
-        
-        Steps:
-        {chr(10).join([f'{i+1}. {step}' for i, step in enumerate(agent_results.get('results', []))])}
-        
-        Timestamp: {datetime.now().isoformat()}
-        """
+        payload = {"data": agent_results, "timestamp": datetime.now().strftime('%Y-%m-%dT%H:%M')}
+        return renderer.render("agent_report_text", payload, lambda p: {
+            "task": p["data"].get('task', 'Unknown'),
+            "status": p["data"].get('status', 'unknown'),
+            "steps_executed": p["data"].get('steps_executed', 0),
+            "steps": "\n".join(f'{i}. {step}' for i, step in enumerate(p["data"].get('results', []), 1)),
+            "timestamp": p["timestamp"]
+        })
     
-    def _log_email_sent(self, data: Dict, result: Dict):
+    def _log_email_sent(self, data: Dict, result: Dict, email_type: str = "portfolio_summary"):
         """Log email sending for tracking"""
         log_entry = {
-            "type": "portfolio_summary",
+            "type": email_type,
             "data": {k: v for k, v in data.items() if k not in ['html', 'text']},
             "result": result,
             "timestamp": datetime.now().isoformat()
         }
-        
-        os.makedirs("logs", exist_ok=True)
-        log_file = f"logs/email_log_{datetime.now().strftime('%Y%m%d')}.json"
-        
-        # Load existing logs or create new
-        logs = []
-        if os.path.exists(log_file):
-            with open(log_file, 'r') as f:
-                logs = json.load(f)
-        
-        logs.append(log_entry)
-        
-        with open(log_file, 'w') as f:
-            json.dump(logs, f, indent=2)
+        self.email_log.append(log_entry)
+    
+    def get_email_logs(self, days: int = 7, email_type: Optional[str] = None,
+                       limit: Optional[int] = None) -> List[Dict]:
+        """Logged emails from the last `days` days (today counts as day 1), oldest first"""
+        since = (datetime.now() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        return self.email_log.query(since=since, email_type=email_type, limit=limit)
 
 # Singleton instance
-email_service = EmailService()
\ No newline at end of file
+email_service = EmailService()
+
+router = APIRouter(prefix="/email", tags=["email"])
+
+
+def _wait_for_delivery(record: Dict, wait: float) -> Dict:
+    """Optionally block (max 60s overall) until the queued message(s) settle"""
+    if wait <= 0:
+        return record
+    if "message_id" in record:
+        return email_service.outbox.wait(record["message_id"], min(wait, 60)) or record
+    
+    deadline = time.monotonic() + min(wait, 60)
+    messages = [
+        email_service.outbox.wait(m["message_id"], max(deadline - time.monotonic(), 0)) or m
+        for m in record["messages"]
+    ]
+    statuses = {m["status"] for m in messages}
+    return {"status": statuses.pop() if len(statuses) == 1 else "mixed", "messages": messages}
+
+
+@router.get("/logs")
+def email_logs(days: int = 7, type: Optional[str] = None, limit: Optional[int] = None):
+    """Logged emails, oldest first; optionally one type and only the newest `limit`"""
+    emails = email_service.get_email_logs(days, type, limit)
+    return {"emails": emails, "count": len(emails), "days": days}
+
+
+@router.post("/summary")
+def email_summary(payload: dict, wait: float = 0,
+                  idempotency_key: Optional[str] = Header(None)):
+    """
+    Queue the portfolio summary email (falls back to a local file)
+    - wait: seconds to block for the delivery result
+    - Idempotency-Key header: repeats return the first message
+    """
+    record = email_service.send_portfolio_summary(payload, idempotency_key)
+    return _wait_for_delivery(record, wait)
+
+
+@router.post("/agent-report")
+def email_agent_report(payload: dict, wait: float = 0,
+                       idempotency_key: Optional[str] = Header(None)):
+    """Queue an agent execution report email"""
+    record = email_service.send_daily_report(payload, idempotency_key)
+    return _wait_for_delivery(record, wait)
+
+
+@router.get("/messages/{message_id}")
+def email_message(message_id: str, wait: float = 0):
+    """Delivery status of a queued email"""
+    record = email_service.outbox.get(message_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Message not found")
+    return _wait_for_delivery(record, wait)
@@ -0,0 +1,220 @@
+"""
+EMAIL TEMPLATES - Precompiled email bodies
+Static shells are parsed once into string.Template; a render only
+substitutes the dynamic fields, HTML-escaped unless marked SafeHTML
+- Renders cached per (template, payload hash)
+"""
+
+import os
+import html
+import json
+import hashlib
+from string import Template
+from typing import Any, Callable, Dict
+
+from cache_utils import LRUCache
+
+
+class SafeHTML(str):
+    """Markup that is already escaped and is substituted as-is"""
+
+
+def escape(value: Any) -> str:
+    return value if isinstance(value, SafeHTML) else html.escape(str(value))
+
+
+class EmailTemplate:
+    """A string.Template shell; HTML templates escape every field"""
+
+    def __init__(self, source: str, autoescape: bool = True):
+        self.template = Template(source)
+        self.autoescape = autoescape
+
+    def render(self, fields: Dict[str, Any]) -> str:
+        if self.autoescape:
+            fields = {name: escape(value) for name, value in fields.items()}
+        return self.template.substitute(fields)
+
+
+SUMMARY_HTML = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <style>
+                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px; }
+                .header { background: linear-gradient(135deg, #4361ee, #3a0ca3); color: white; padding: 30px; border-radius: 10px 10px 0 0; text-align: center; }
+                .content { background: #f8f9fa; padding: 30px; border-radius: 0 0 10px 10px; }
+                .stats { display: grid; grid-template-columns: repeat(3, 1fr); gap: 15px; margin: 20px 0; }
+                .stat-box { background: white; padding: 15px; border-radius: 8px; text-align: center; box-shadow: 0 2px 5px rgba(0,0,0,0.1); }
+                .stat-value { font-size: 24px; font-weight: bold; color: #4361ee; }
+                .stat-label { font-size: 12px; color: #666; margin-top: 5px; }
+                .section { margin: 25px 0; }
+                .ai-message { background: #e3f2fd; padding: 15px; border-radius: 8px; border-left: 4px solid #4361ee; }
+                .footer { margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; font-size: 12px; color: #666; text-align: center; }
+                .btn { display: inline-block; background: #4361ee; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; margin: 10px 0; }
+            </style>
+        </head>
+        <body>
+            <div class="header">
+                <h1>🤖 AI Portfolio Summary</h1>
+                <p>$date</p>
+            </div>
+            
+            <div class="content">
+                <div class="section">
+                    <h2>📊 Daily Overview</h2>
+                    <p>Your AI-powered portfolio had activity today. Here's what happened:</p>
+                    
+                    <div class="stats">
+                        <div class="stat-box">
+                            <div class="stat-value">$chat_count</div>
+                            <div class="stat-label">Chats Today</div>
+                        </div>
+                        <div class="stat-box">
+                            <div class="stat-value">$agent_tasks</div>
+                            <div class="stat-label">Agent Tasks</div>
+                        </div>
+                        <div class="stat-box">
+                            <div class="stat-value">$memory_entries</div>
+                            <div class="stat-label">Memory Entries</div>
+                        </div>
+                    </div>
+                </div>
+                
+                <div class="section">
+                    <h2>🤖 AI Insights</h2>
+                    <div class="ai-message">
+                        <p>$ai_summary</p>
+                    </div>
+                </div>
+                
+                <div class="section">
+                    <h2>🚀 Recent Activity</h2>
+                    <ul>
+                        $activities
+                    </ul>
+                </div>
+                
+                <div class="section">
+                    <h2>🎯 What's Next?</h2>
+                    <p>Based on your learning patterns, consider exploring:</p>
+                    <ul>
+                        <li><strong>AI Agents:</strong> Extend your agent with new tools</li>
+                        <li><strong>Automation:</strong> Add more n8n workflows</li>
+                        <li><strong>Frontend:</strong> Enhance the dashboard with charts</li>
+                    </ul>
+                </div>
+                
+                <a href="http://localhost:8080" class="btn">View Live Portfolio</a>
+                
+                <div class="footer">
+                    <p>This email was automatically generated by your AI Portfolio system.</p>
+                    <p>You're receiving this because you enabled daily summaries.</p>
+                    <p><a href="http://localhost:8080#settings" style="color: #4361ee;">Adjust email settings</a></p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+SUMMARY_TEXT = """
+        AI Portfolio Summary - $date
+        
+        Daily Overview:
+        - Chats Today: $chat_count
+        - Agent Tasks: $agent_tasks
+        - Memory Entries: $memory_entries
+        
+        AI Insights:
+        $ai_summary
+        
+        View your portfolio: http://localhost:8080
+        
+        This email was automatically generated by your AI Portfolio system.
+        """
+
+AGENT_REPORT_HTML = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <style>
+                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px; }
+                .header { background: linear-gradient(135deg, #28a745, #20c997); color: white; padding: 30px; border-radius: 10px 10px 0 0; text-align: center; }
+                .content { background: #f8f9fa; padding: 30px; border-radius: 0 0 10px 10px; }
+                .step { background: white; padding: 15px; margin: 10px 0; border-radius: 8px; border-left: 4px solid #28a745; }
+                .success { color: #28a745; }
+                .error { color: #dc3545; }
+                .footer { margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; font-size: 12px; color: #666; text-align: center; }
+            </style>
+        </head>
+        <body>
+            <div class="header">
+                <h1>🤖 AI Agent Execution Report</h1>
+                <p>$date</p>
+            </div>
+            
+            <div class="content">
+                <h2>Task: $task</h2>
+                <p><strong>Status:</strong> <span class="$status">$status_label</span></p>
+                <p><strong>Steps Executed:</strong> $steps_executed</p>
+                
+                <h3>Execution Steps:</h3>
+                $steps
+                
+                <div class="footer">
+                    <p>This report was generated automatically by your AI Portfolio system.</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+AGENT_REPORT_TEXT = """
+        AI Agent Execution Report
+        
+        Task: $task
+        Status: $status
+        Steps Executed: $steps_executed
+        
+        Steps:
+        $steps
+        
+        Timestamp: $timestamp
+        """
+
+
+class TemplateRenderer:
+    """Named templates plus an LRU of finished renders"""
+
+    def __init__(self, maxsize: int = None):
+        self.templates = {
+            "summary_html": EmailTemplate(SUMMARY_HTML),
+            "summary_text": EmailTemplate(SUMMARY_TEXT, autoescape=False),
+            "agent_report_html": EmailTemplate(AGENT_REPORT_HTML),
+            "agent_report_text": EmailTemplate(AGENT_REPORT_TEXT, autoescape=False),
+        }
+        self.cache = LRUCache(maxsize or int(os.getenv("EMAIL_RENDER_CACHE_SIZE", "256")))
+
+    @staticmethod
+    def payload_hash(name: str, payload: Any) -> str:
+        canonical = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(f"{name}\0{canonical}".encode("utf-8")).hexdigest()
+
+    def render(self, name: str, payload: Any, build_fields: Callable[[Any], Dict[str, Any]]) -> str:
+        """
+        Render template `name` for `payload`.
+        build_fields(payload) only runs on a cache miss, so list fragments
+        and other derived fields are built once per distinct payload.
+        """
+        key = self.payload_hash(name, payload)
+        rendered = self.cache.get(key)
+        if rendered is None:
+            rendered = self.templates[name].render(build_fields(payload))
+            self.cache.set(key, rendered)
+        return rendered
+
+
+# Singleton instance
+renderer = TemplateRenderer()
@@ -0,0 +1,80 @@
+"""
+EMBEDDING CACHE - Content-addressed embeddings
+Identical text (per model) never costs a second embeddings API call
+- Tier 1: in-memory LRU of float32 vectors
+- Tier 2: optional directory of .npy files (EMBEDDING_CACHE_DIR)
+"""
+
+import os
+import hashlib
+from typing import Dict, Optional
+import numpy as np
+
+from cache_utils import LRUCache
+
+
+class EmbeddingCache:
+    """Embeddings keyed by sha256(model + whitespace-normalized text)"""
+
+    def __init__(self, maxsize: int = None, cache_dir: Optional[str] = None):
+        self.memory = LRUCache(maxsize or int(os.getenv("EMBEDDING_CACHE_SIZE", "2048")))
+        self.cache_dir = cache_dir if cache_dir is not None else os.getenv("EMBEDDING_CACHE_DIR")
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npy")
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        """Cached vector or None"""
+        key = self.make_key(model, text)
+        vector = self.memory.get(key)
+        if vector is not None:
+            return vector
+
+        if self.cache_dir:
+            try:
+                vector = np.load(self._disk_path(key))
+            except (OSError, ValueError):
+                vector = None
+            if vector is not None:
+                self.disk_hits += 1
+                self.memory.set(key, vector)
+                return vector
+
+        self.misses += 1
+        return None
+
+    def set(self, model: str, text: str, embedding) -> np.ndarray:
+        """Store an embedding in both tiers, returns it as float32"""
+        key = self.make_key(model, text)
+        vector = np.asarray(embedding, dtype=np.float32)
+        self.memory.set(key, vector)
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, vector)
+            os.replace(tmp_path, path)
+        return vector
+
+    def get_stats(self) -> Dict:
+        memory_stats = self.memory.get_stats()
+        lookups = memory_stats["hits"] + self.disk_hits + self.misses
+        return {
+            "memory_hits": memory_stats["hits"],
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((lookups - self.misses) / lookups, 3) if lookups else 0.0,
+            "memory_entries": memory_stats["size"],
+            "disk_enabled": bool(self.cache_dir)
+        }
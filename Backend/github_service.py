@@ -4,17 +4,150 @@ Fetch and analyze GitHub data for portfolio
 """
 
 import os
+import json
+import time
+import hashlib
+import itertools
+import threading
 import requests
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
 import logging
 from dotenv import load_dotenv
+from fastapi import APIRouter, HTTPException
+
+from cache_utils import LRUCache
 
 load_dotenv()
 
+GITHUB_TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def github_timestamp(days_ago: float = 0) -> str:
+    """UTC time in GitHub's format; these strings sort chronologically"""
+    return (datetime.now(timezone.utc) - timedelta(days=days_ago)).strftime(GITHUB_TIME_FORMAT)
+
+
+class ContributionRollup:
+    """Per-day event counters, persisted and folded forward incrementally"""
+    
+    EVENT_COUNTERS = {
+        "PushEvent": "pushes",
+        "PullRequestEvent": "pull_requests",
+        "IssuesEvent": "issues",
+        "CreateEvent": "creates",
+        "DeleteEvent": "deletes",
+    }
+    
+    def __init__(self, storage_file: str = None, retention_days: int = 365):
+        self.storage_file = storage_file or os.getenv("GITHUB_ROLLUP_FILE", "github_contributions.json")
+        self.retention_days = retention_days
+        self.username = None
+        self.last_event_id = 0
+        self.days: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+        self._load()
+    
+    def _load(self):
+        if not os.path.exists(self.storage_file):
+            return
+        try:
+            with open(self.storage_file, 'r') as f:
+                saved = json.load(f)
+            self.username = saved["username"]
+            self.last_event_id = saved["last_event_id"]
+            self.days = saved["days"]
+        except (OSError, ValueError, KeyError):
+            self.days = {}
+    
+    def save(self):
+        tmp_file = self.storage_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({"username": self.username, "last_event_id": self.last_event_id, "days": self.days}, f)
+        os.replace(tmp_file, self.storage_file)
+    
+    def reset(self, username: str):
+        self.username = username
+        self.last_event_id = 0
+        self.days = {}
+    
+    def fold(self, events: List[Dict]):
+        """Add newly seen events to their day's counters"""
+        for event in events:
+            day = self.days.setdefault(event['created_at'][:10], {
+                "events": 0, "pushes": 0, "pull_requests": 0, "issues": 0,
+                "creates": 0, "deletes": 0, "commits": 0, "repos": []
+            })
+            day["events"] += 1
+            counter = self.EVENT_COUNTERS.get(event['type'])
+            if counter:
+                day[counter] += 1
+            if event['type'] == "PushEvent":
+                day["commits"] += event['payload'].get('size', 0)
+                repo_name = event['repo']['name']
+                if repo_name not in day["repos"]:
+                    day["repos"].append(repo_name)
+            self.last_event_id = max(self.last_event_id, int(event['id']))
+        
+        # Drop days past retention (keys are ISO dates, so they compare as strings)
+        cutoff = github_timestamp(self.retention_days)[:10]
+        for date in [d for d in self.days if d < cutoff]:
+            del self.days[date]
+    
+    def summary(self, days: int = 90) -> Dict:
+        """Totals over the window, O(days) with no event scanning"""
+        cutoff = github_timestamp(days)[:10]
+        summary = {
+            "total_events": 0,
+            "push_events": 0,
+            "pull_request_events": 0,
+            "issue_events": 0,
+            "create_events": 0,
+            "delete_events": 0,
+            "commit_count": 0,
+            "repos_contributed_to": set(),
+            f"last_{days}_days": {}
+        }
+        
+        for date in sorted(self.days):
+            if date < cutoff:
+                continue
+            day = self.days[date]
+            summary["total_events"] += day["events"]
+            summary["push_events"] += day["pushes"]
+            summary["pull_request_events"] += day["pull_requests"]
+            summary["issue_events"] += day["issues"]
+            summary["create_events"] += day["creates"]
+            summary["delete_events"] += day["deletes"]
+            summary["commit_count"] += day["commits"]
+            summary["repos_contributed_to"].update(day["repos"])
+            summary[f"last_{days}_days"][date] = {
+                "pushes": day["pushes"],
+                "pull_requests": day["pull_requests"],
+                "issues": day["issues"],
+                "commits": day["commits"]
+            }
+        
+        summary["repos_contributed_to"] = list(summary["repos_contributed_to"])
+        summary["repos_contributed_count"] = len(summary["repos_contributed_to"])
+        return summary
+
+
 class GitHubService:
     """Service to interact with GitHub API"""
     
+    # Fresh-for seconds by endpoint path (first matching suffix wins)
+    CACHE_TTLS = [
+        ("/events", 60),
+        ("/languages", 3600),
+        ("/commits", 300),
+        ("/user", 600),
+    ]
+    DEFAULT_CACHE_TTL = 300
+    
     def __init__(self):
         self.token = os.getenv("GITHUB_TOKEN")
         self.username = os.getenv("GITHUB_USERNAME")
@@ -24,30 +157,250 @@ class GitHubService:
             "Accept": "application/vnd.github.v3+json"
         }
         
-        # Cache for frequent requests
-        self.cache = {}
-        self.cache_timeout = 300  # 5 minutes
+        # Cache for frequent requests: endpoint -> (data, fetched_at, etag, links).
+        # Past its TTL an entry is served stale while a background refresh runs;
+        # past TTL + max_stale it is refetched on the request path.
+        self.cache = LRUCache(maxsize=int(os.getenv("GITHUB_CACHE_SIZE", "512")))
+        self.max_stale = 24 * 3600
+        self.cache_dir = os.getenv("GITHUB_CACHE_DIR")
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        self.stale_served = 0
+        self.disk_hits = 0
+        
+        # Single-flight: concurrent misses for one endpoint share one fetch
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="github-refresh")
+        
+        self.rollup = ContributionRollup()
+        
+        # Pooled keep-alive connections, sized for the parallel fan-out
+        self.max_workers = int(os.getenv("GITHUB_MAX_WORKERS", "8"))
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("https://", adapter)
+        self.request_timeout = 15
+        
+        # Rate limit state from the last response headers
+        self.rate_limit_remaining = None
+        self.rate_limit_reset = 0.0
+        self.max_retries = 3
+        self.max_backoff = 60  # Never sleep longer than this per attempt
+        self._rate_lock = threading.Lock()
         
     def _make_request(self, endpoint: str, use_cache: bool = True) -> Dict:
         """Make authenticated request to GitHub API"""
-        cache_key = endpoint
+        return self._request_entry(endpoint, use_cache)[0]
+    
+    def _request_entry(self, endpoint: str, use_cache: bool = True) -> Tuple:
+        """Cache entry (data, fetched_at, etag, links) for an endpoint"""
+        if not use_cache:
+            return self._single_flight(endpoint)
+        
+        entry = self._cached_entry(endpoint)
+        if entry is None:
+            return self._single_flight(endpoint)
+        
+        age = time.time() - entry[1]
+        ttl = self._ttl_for(endpoint)
+        if age < ttl:
+            return entry
+        if age < ttl + self.max_stale:
+            # Stale-while-revalidate: answer now, refresh off the request path
+            self.stale_served += 1
+            self._refresh_in_background(endpoint)
+            return entry
+        return self._single_flight(endpoint)
+    
+    def _paginate(self, endpoint: str, per_page: int = 100, concurrent: bool = False) -> Iterator[Dict]:
+        """
+        Lazily yield items across pages by following Link headers.
+        Stop consuming to stop fetching. With concurrent=True the remaining
+        pages are fetched in parallel once page 1 reveals the last page.
+        """
+        separator = "&" if "?" in endpoint else "?"
+        page_endpoint = lambda page: f"{endpoint}{separator}per_page={per_page}&page={page}"
         
-        # Check cache
-        if use_cache and cache_key in self.cache:
-            cached_data, timestamp = self.cache[cache_key]
-            if datetime.now().timestamp() - timestamp < self.cache_timeout:
-                return cached_data
+        data, _, _, links = self._request_entry(page_endpoint(1))
+        yield from data
         
+        if concurrent and links.get("last"):
+            pages = [page_endpoint(page) for page in range(2, links["last"] + 1)]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for page_data in pool.map(self._make_request, pages):
+                    yield from page_data
+            return
+        
+        while links.get("next"):
+            data, _, _, links = self._request_entry(page_endpoint(links["next"]))
+            yield from data
+    
+    @staticmethod
+    def _page_links(response: requests.Response) -> Dict[str, int]:
+        """Page numbers from the Link header, e.g. {"next": 2, "last": 7}"""
+        pages = {}
+        for rel, link in response.links.items():
+            page = parse_qs(urlparse(link.get("url", "")).query).get("page")
+            if page and page[0].isdigit():
+                pages[rel] = int(page[0])
+        return pages
+    
+    def _ttl_for(self, endpoint: str) -> int:
+        path = endpoint.split("?", 1)[0]
+        for marker, ttl in self.CACHE_TTLS:
+            if path.endswith(marker):
+                return ttl
+        return self.DEFAULT_CACHE_TTL
+    
+    def _cached_entry(self, endpoint: str) -> Optional[Tuple]:
+        """Memory tier first, then the on-disk tier (if configured)"""
+        entry = self.cache.get(endpoint)
+        if entry is not None or not self.cache_dir:
+            return entry
+        try:
+            with open(self._disk_path(endpoint), 'r') as f:
+                saved = json.load(f)
+            entry = (saved["data"], saved["fetched_at"], saved.get("etag"), saved.get("links", {}))
+        except (OSError, ValueError, KeyError):
+            return None
+        self.disk_hits += 1
+        self.cache.set(endpoint, entry)
+        return entry
+    
+    def _disk_path(self, endpoint: str) -> str:
+        key = hashlib.sha256(endpoint.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+    
+    def _store(self, endpoint: str, entry: Tuple):
+        self.cache.set(endpoint, entry)
+        if not self.cache_dir:
+            return
+        data, fetched_at, etag, links = entry
+        path = self._disk_path(endpoint)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({"endpoint": endpoint, "fetched_at": fetched_at, "etag": etag,
+                           "links": links, "data": data}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"GitHub disk cache write failed: {e}")
+    
+    def _single_flight(self, endpoint: str) -> Tuple:
+        """Fetch an endpoint, or wait for the fetch another thread already started"""
+        with self._inflight_lock:
+            future = self._inflight.get(endpoint)
+            owner = future is None
+            if owner:
+                future = self._inflight[endpoint] = Future()
+        
+        if owner:
+            try:
+                future.set_result(self._fetch(endpoint))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._inflight_lock:
+                    self._inflight.pop(endpoint, None)
+        return future.result()
+    
+    def _refresh_in_background(self, endpoint: str):
+        with self._inflight_lock:
+            if endpoint in self._inflight:
+                return
+        self._refresher.submit(self._refresh, endpoint)
+    
+    def _refresh(self, endpoint: str):
+        try:
+            self._single_flight(endpoint)
+        except Exception as e:
+            logging.warning(f"GitHub background refresh failed for {endpoint}: {e}")
+    
+    def _fetch(self, endpoint: str) -> Tuple:
+        """Conditional GET; a 304 (free against the rate limit) reuses the cached body"""
         url = f"{self.base_url}{endpoint}"
-        response = requests.get(url, headers=self.headers)
+        headers = {}
+        entry = self._cached_entry(endpoint)
+        if entry and entry[2]:
+            headers["If-None-Match"] = entry[2]
+        
+        response = self._get(url, headers)
         
-        if response.status_code == 200:
-            data = response.json()
-            # Update cache
-            self.cache[cache_key] = (data, datetime.now().timestamp())
-            return data
+        if response.status_code == 304 and entry:
+            # Unchanged upstream: reuse the body we already have
+            data, etag, links = entry[0], entry[2], entry[3]
+        elif response.status_code == 200:
+            data, etag, links = response.json(), response.headers.get("ETag"), self._page_links(response)
         else:
             raise Exception(f"GitHub API error: {response.status_code} - {response.text}")
+        
+        # Update cache
+        entry = (data, time.time(), etag, links)
+        self._store(endpoint, entry)
+        return entry
+    
+    def get_cache_stats(self) -> Dict:
+        return {
+            **self.cache.get_stats(),
+            "stale_served": self.stale_served,
+            "disk_hits": self.disk_hits,
+            "disk_enabled": bool(self.cache_dir),
+            "refreshing": len(self._inflight)
+        }
+    
+    def _get(self, url: str, headers: Dict) -> requests.Response:
+        """GET on the pooled session, backing off when rate limited"""
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_rate_limit()
+            response = self.session.get(url, headers=headers, timeout=self.request_timeout)
+            self._record_rate_limit(response)
+            
+            if response.status_code in (403, 429) and attempt < self.max_retries:
+                delay = self._retry_delay(response, attempt)
+                if delay is not None:
+                    logging.warning(f"GitHub rate limited, retrying in {delay:.0f}s")
+                    time.sleep(delay)
+                    continue
+            return response
+        return response
+    
+    def _record_rate_limit(self, response: requests.Response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        with self._rate_lock:
+            if remaining is not None:
+                self.rate_limit_remaining = int(remaining)
+            if reset is not None:
+                self.rate_limit_reset = float(reset)
+    
+    def _wait_for_rate_limit(self):
+        """If the last response said the budget is spent, wait for the reset"""
+        with self._rate_lock:
+            exhausted = self.rate_limit_remaining == 0
+            wait = self.rate_limit_reset - time.time()
+        if exhausted and wait > 0:
+            time.sleep(min(wait, self.max_backoff))
+    
+    def _retry_delay(self, response: requests.Response, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None if this 403 isn't rate limiting"""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            return min(float(retry_after), self.max_backoff)
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            reset = float(response.headers.get("X-RateLimit-Reset", time.time()))
+            return min(max(reset - time.time(), 1), self.max_backoff)
+        if response.status_code == 429:
+            return min(2 ** attempt, self.max_backoff)
+        return None
+    
+    def get_rate_limit_status(self) -> Dict:
+        """Last seen rate limit budget"""
+        return {
+            "remaining": self.rate_limit_remaining,
+            "resets_at": datetime.fromtimestamp(self.rate_limit_reset).isoformat() if self.rate_limit_reset else None
+        }
     
     def get_user_profile(self) -> Dict:
         """Get GitHub user profile"""
@@ -55,7 +408,7 @@ class GitHubService:
     
     def get_repositories(self) -> List[Dict]:
         """Get user repositories (including private if token has access)"""
-        repos = self._make_request(f"/users/{self.username}/repos?per_page=100")
+        repos = list(self._paginate(f"/users/{self.username}/repos", concurrent=True))
         
         # Sort by last updated
         repos.sort(key=lambda x: x.get('updated_at', ''), reverse=True)
@@ -68,94 +421,64 @@ class GitHubService:
     def get_user_activity(self, days: int = 30) -> List[Dict]:
         """Get user activity events"""
         # Calculate date range
-        since_date = (datetime.now() - timedelta(days=days)).isoformat()
-        events = self._make_request(f"/users/{self.username}/events?per_page=100")
+        since_date = github_timestamp(days)
         
-        # Filter by date and type
+        # Events come newest first: stop paging at the first one outside the window
         filtered_events = []
-        for event in events:
-            event_date = datetime.strptime(event['created_at'], '%Y-%m-%dT%H:%M:%SZ')
-            if event_date >= datetime.now() - timedelta(days=days):
-                filtered_events.append(event)
+        for event in self._paginate(f"/users/{self.username}/events"):
+            if event['created_at'] < since_date:
+                break
+            filtered_events.append(event)
         
         return filtered_events
     
-    def get_commit_history(self, repo_name: str) -> List[Dict]:
-        """Get commit history for a repository"""
-        commits = self._make_request(f"/repos/{self.username}/{repo_name}/commits?per_page=50")
-        return commits
+    def get_commit_history(self, repo_name: str, limit: int = 50) -> List[Dict]:
+        """Get the most recent commits for a repository"""
+        commits = self._paginate(f"/repos/{self.username}/{repo_name}/commits", per_page=min(limit, 100))
+        return list(itertools.islice(commits, limit))
+    
+    def get_commit_count(self, repo_name: str) -> int:
+        """Total commits on the default branch: with per_page=1 the last page number is the count"""
+        commits, _, _, links = self._request_entry(f"/repos/{self.username}/{repo_name}/commits?per_page=1")
+        return links.get("last", len(commits))
     
-    def get_contributions_summary(self) -> Dict:
+    def get_contributions_summary(self, days: int = 90) -> Dict:
         """Get contributions summary (commits, PRs, issues, etc.)"""
-        events = self.get_user_activity(days=90)
-        
-        summary = {
-            "total_events": len(events),
-            "push_events": 0,
-            "pull_request_events": 0,
-            "issue_events": 0,
-            "create_events": 0,
-            "delete_events": 0,
-            "commit_count": 0,
-            "repos_contributed_to": set(),
-            "last_90_days": {}
-        }
-        
-        # Count events by type and date
-        for event in events:
-            event_type = event['type']
-            event_date = event['created_at'][:10]  # YYYY-MM-DD
+        with self.rollup.lock:
+            if self.rollup.username != self.username:
+                self.rollup.reset(self.username)
             
-            # Initialize date in summary
-            if event_date not in summary["last_90_days"]:
-                summary["last_90_days"][event_date] = {
-                    "pushes": 0,
-                    "pull_requests": 0,
-                    "issues": 0,
-                    "commits": 0
-                }
+            # Only events newer than the last one folded in (or the window, on first run)
+            since_date = github_timestamp(days)
+            new_events = []
+            for event in self._paginate(f"/users/{self.username}/events"):
+                if int(event['id']) <= self.rollup.last_event_id or event['created_at'] < since_date:
+                    break
+                new_events.append(event)
             
-            # Count by type
-            if event_type == "PushEvent":
-                summary["push_events"] += 1
-                summary["last_90_days"][event_date]["pushes"] += 1
-                summary["commit_count"] += event['payload'].get('size', 0)
-                
-                # Track repos
-                repo_name = event['repo']['name']
-                summary["repos_contributed_to"].add(repo_name)
-                
-            elif event_type == "PullRequestEvent":
-                summary["pull_request_events"] += 1
-                summary["last_90_days"][event_date]["pull_requests"] += 1
-            elif event_type == "IssuesEvent":
-                summary["issue_events"] += 1
-                summary["last_90_days"][event_date]["issues"] += 1
-            elif event_type == "CreateEvent":
-                summary["create_events"] += 1
-            elif event_type == "DeleteEvent":
-                summary["delete_events"] += 1
-        
-        summary["repos_contributed_to"] = list(summary["repos_contributed_to"])
-        summary["repos_contributed_count"] = len(summary["repos_contributed_to"])
-        
-        return summary
+            if new_events:
+                self.rollup.fold(new_events)
+                self.rollup.save()
+            return self.rollup.summary(days)
     
-    def get_language_stats(self) -> Dict:
+    def get_language_stats(self, repos: Optional[List[Dict]] = None) -> Dict:
         """Get programming language statistics across all repos"""
-        repos = self.get_repositories()
+        if repos is None:
+            repos = self.get_repositories()
         language_stats = {}
         
-        for repo in repos:
-            if not repo['fork']:  # Only non-forked repos
-                repo_name = repo['name']
-                try:
-                    languages = self.get_repository_languages(repo_name)
-                    
-                    for lang, bytes_count in languages.items():
-                        language_stats[lang] = language_stats.get(lang, 0) + bytes_count
-                except:
-                    continue
+        def fetch_languages(repo_name: str) -> Dict:
+            try:
+                return self.get_repository_languages(repo_name)
+            except:
+                return {}
+        
+        # Only non-forked repos, fetched in parallel over the pooled session
+        repo_names = [repo['name'] for repo in repos if not repo['fork']]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for languages in pool.map(fetch_languages, repo_names):
+                for lang, bytes_count in languages.items():
+                    language_stats[lang] = language_stats.get(lang, 0) + bytes_count
         
         # Calculate percentages
         total_bytes = sum(language_stats.values())
@@ -185,9 +508,83 @@ class GitHubService:
             "basic_info": repo,
             "languages": languages,
             "recent_commits": commits[:5],  # Last 5 commits
-            "total_commits": len(commits),
+            "total_commits": self.get_commit_count(repo_name),
             "primary_language": repo.get('language', 'Unknown')
         }
 
+    def get_dashboard(self) -> Dict:
+        """Profile, repos, contributions and languages in one pass.
+        
+        The repository list is fetched once and shared with the language
+        stats, while profile and contributions load concurrently.
+        """
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            profile = pool.submit(self.get_user_profile)
+            contributions = pool.submit(self.get_contributions_summary)
+            
+            repos = self.get_repositories()
+            languages = self.get_language_stats(repos)
+            
+            return {
+                "profile": profile.result(),
+                "repositories": repos,
+                "contributions": contributions.result(),
+                "languages": languages,
+                "timestamp": datetime.now().isoformat()
+            }
+
 # Singleton instance
-github_service = GitHubService()
\ No newline at end of file
+github_service = GitHubService()
+
+router = APIRouter(prefix="/github", tags=["github"])
+
+
+def _github_call(method, *args):
+    try:
+        return method(*args)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+
+@router.get("/health")
+def github_health():
+    """Whether the configured token can reach the GitHub API"""
+    if not github_service.token:
+        return {"status": "error", "error": "GITHUB_TOKEN is not set"}
+    try:
+        profile = github_service.get_user_profile()
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+    return {
+        "status": "connected",
+        "username": profile.get("login", github_service.username),
+        "rate_limit": github_service.get_rate_limit_status(),
+        "cache": github_service.get_cache_stats()
+    }
+
+
+@router.get("/profile")
+def github_profile():
+    return _github_call(github_service.get_user_profile)
+
+
+@router.get("/repos")
+def github_repos():
+    repos = _github_call(github_service.get_repositories)
+    return {"repositories": repos, "count": len(repos)}
+
+
+@router.get("/contributions")
+def github_contributions():
+    return _github_call(github_service.get_contributions_summary)
+
+
+@router.get("/languages")
+def github_languages():
+    return _github_call(github_service.get_language_stats)
+
+
+@router.get("/dashboard")
+def github_dashboard():
+    """Everything the GitHub dashboard shows, in one round-trip"""
+    return _github_call(github_service.get_dashboard)
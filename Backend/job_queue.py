@@ -0,0 +1,207 @@
+"""
+JOB QUEUE - Background execution for slow tasks
+In-process worker pool so /agent/task and n8n webhooks return immediately
+- Bounded queue depth (submit fails fast when full)
+- Job IDs with status/result polling (optionally long-polling)
+"""
+
+import os
+import uuid
+import asyncio
+import queue
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException
+
+
+class JobStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when the queue is at max depth"""
+
+
+class JobQueue:
+    """Fixed worker pool pulling from a bounded FIFO queue"""
+
+    def __init__(self, workers: int = None, max_depth: int = None, max_finished: int = 1000):
+        self.workers = workers or int(os.getenv("JOB_WORKERS", "2"))
+        self.max_depth = max_depth or int(os.getenv("JOB_QUEUE_DEPTH", "100"))
+        self.max_finished = max_finished  # Finished jobs kept for polling
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=self.max_depth)
+        self._handlers: Dict[str, Callable[[Dict], Any]] = {}
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._events: Dict[str, threading.Event] = {}
+        # Long-polls parked on an event loop, woken from the worker thread
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def register(self, kind: str, handler: Callable[[Dict], Any]):
+        """Handler receives the job payload and returns a JSON-serializable result"""
+        self._handlers[kind] = handler
+
+    def start(self):
+        """Start worker threads (idempotent)"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, kind: str, payload: Dict) -> Dict:
+        """Queue a job, returns its record immediately"""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job type '{kind}'")
+        self.start()
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "type": kind,
+            "payload": payload,
+            "status": JobStatus.QUEUED.value,
+            "created": datetime.now().isoformat(),
+            "started": None,
+            "finished": None,
+            "result": None,
+            "error": None
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._events[job_id] = threading.Event()
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job_id]
+                del self._events[job_id]
+            raise QueueFullError(f"Job queue is full ({self.max_depth} pending)")
+        return dict(job)
+
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+            if job is None:
+                continue
+
+            job["status"] = JobStatus.RUNNING.value
+            job["started"] = datetime.now().isoformat()
+            try:
+                job["result"] = self._handlers[job["type"]](job["payload"])
+                job["status"] = JobStatus.COMPLETED.value
+            except Exception as e:
+                job["error"] = str(e)
+                job["status"] = JobStatus.FAILED.value
+            job["finished"] = datetime.now().isoformat()
+
+            with self._lock:
+                event = self._events.pop(job_id, None)
+                waiters = self._waiters.pop(job_id, [])
+                self._forget_old_jobs()
+            if event:
+                event.set()
+            for loop, done in waiters:
+                try:
+                    loop.call_soon_threadsafe(done.set)
+                except RuntimeError:
+                    pass  # Loop already closed
+
+    def _forget_old_jobs(self):
+        """Keep at most max_finished finished jobs (oldest dropped first)"""
+        finished = [jid for jid, j in self._jobs.items()
+                    if j["status"] in (JobStatus.COMPLETED.value, JobStatus.FAILED.value)]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """Block until the job finishes or timeout expires, then return it"""
+        with self._lock:
+            event = self._events.get(job_id)
+        if event:
+            event.wait(timeout)
+        return self.get(job_id)
+
+    async def await_job(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """wait() for async callers: parks on the event loop, not a worker thread"""
+        done = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), done)
+        with self._lock:
+            pending = job_id in self._events
+            if pending:
+                self._waiters.setdefault(job_id, []).append(waiter)
+        if pending:
+            try:
+                await asyncio.wait_for(done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    waiters = self._waiters.get(job_id)
+                    if waiters and waiter in waiters:
+                        waiters.remove(waiter)
+                        if not waiters:
+                            del self._waiters[job_id]
+        return self.get(job_id)
+
+    def list_jobs(self, limit: int = 20) -> List[Dict]:
+        with self._lock:
+            jobs = list(self._jobs.values())[-limit:]
+        return [{k: v for k, v in j.items() if k != "result"} for j in reversed(jobs)]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            counts = {status.value: 0 for status in JobStatus}
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+        return {
+            "workers": self.workers,
+            "max_depth": self.max_depth,
+            "queue_depth": self._queue.qsize(),
+            "jobs": counts
+        }
+
+
+# Singleton instance
+job_queue = JobQueue()
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("")
+def list_jobs(limit: int = 20):
+    """Recent jobs, newest first (results omitted)"""
+    return {"stats": job_queue.get_stats(), "jobs": job_queue.list_jobs(limit)}
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """
+    Job status and result
+    - wait: seconds to long-poll for completion (max 120)
+    """
+    if wait > 0:
+        job = await job_queue.await_job(job_id, min(wait, 120))
+    else:
+        job = job_queue.get(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
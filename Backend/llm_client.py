@@ -0,0 +1,140 @@
+"""
+LLM CLIENT - Non-blocking OpenAI access
+AsyncOpenAI wrapper shared by the chat endpoints and semantic memory
+- Bounded concurrency so bursts queue instead of piling onto the API
+- One deadline covering queue wait + request
+"""
+
+import os
+import asyncio
+from typing import Callable, Dict, Optional
+from openai import AsyncOpenAI
+
+
+class LLMTimeoutError(Exception):
+    """Raised when a model call (including time spent queued) exceeds its deadline"""
+
+
+class AsyncLLMClient:
+    """AsyncOpenAI with a concurrency limiter and per-call timeouts"""
+
+    def __init__(self, max_concurrency: int = None, timeout: float = None):
+        self.max_concurrency = max_concurrency or int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))
+        self.timeout = timeout or float(os.getenv("OPENAI_TIMEOUT", "30"))
+        # OPENAI_BASE_URL is honoured by the SDK, e.g. to point at a local mock
+        self.client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            timeout=self.timeout,
+            max_retries=1
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight = 0
+        # Token totals; cached_tokens are prompt tokens served from the provider's prefix cache
+        self.usage = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+    
+    @staticmethod
+    def describe_usage(usage) -> Optional[Dict]:
+        """Response usage as a plain dict including cached prompt tokens"""
+        if usage is None:
+            return None
+        details = getattr(usage, "prompt_tokens_details", None)
+        return {
+            "prompt_tokens": usage.prompt_tokens or 0,
+            "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+            "completion_tokens": usage.completion_tokens or 0
+        }
+    
+    def record_usage(self, usage) -> Optional[Dict]:
+        """Add a response's usage to the totals"""
+        record = self.describe_usage(usage)
+        if record is None:
+            return None
+        self.usage["calls"] += 1
+        for key, value in record.items():
+            self.usage[key] += value
+        return record
+
+    async def _call(self, coro_factory, timeout: float = None):
+        """Run one API call under the limiter with an overall deadline"""
+        async def limited():
+            async with self._semaphore:
+                self.in_flight += 1
+                try:
+                    return await coro_factory()
+                finally:
+                    self.in_flight -= 1
+
+        try:
+            return await asyncio.wait_for(limited(), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"Model call exceeded {timeout or self.timeout}s")
+
+    async def chat(self, timeout: float = None, **kwargs):
+        """chat.completions.create without blocking the event loop"""
+        response = await self._call(lambda: self.client.chat.completions.create(**kwargs), timeout)
+        self.record_usage(getattr(response, "usage", None))
+        return response
+
+    async def chat_stream(self, timeout: float = None, on_usage: Callable[[Dict], None] = None, **kwargs):
+        """Yield reply text deltas as they arrive.
+
+        The limiter slot is held for the whole stream; `timeout` bounds the
+        queue wait, the time to first chunk and every gap between chunks.
+        on_usage receives the token usage from the final chunk.
+        """
+        deadline = timeout or self.timeout
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), deadline)
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"No model slot free within {deadline}s")
+
+        self.in_flight += 1
+        stream = None
+        try:
+            stream = await asyncio.wait_for(
+                self.client.chat.completions.create(
+                    stream=True, stream_options={"include_usage": True}, **kwargs
+                ),
+                deadline
+            )
+            chunks = stream.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), deadline)
+                except StopAsyncIteration:
+                    break
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                if getattr(chunk, "usage", None):
+                    record = self.record_usage(chunk.usage)
+                    if on_usage:
+                        on_usage(record)
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"Model stream stalled for more than {deadline}s")
+        finally:
+            try:
+                # Closing returns the connection to the pool on disconnects and stalls too
+                if stream is not None:
+                    await stream.close()
+            finally:
+                self.in_flight -= 1
+                self._semaphore.release()
+
+    async def embed(self, text: str, model: str = "text-embedding-3-small", timeout: float = None):
+        """Embedding vector for one text"""
+        response = await self._call(
+            lambda: self.client.embeddings.create(model=model, input=text), timeout
+        )
+        return response.data[0].embedding
+
+    def get_stats(self) -> dict:
+        prompt_tokens = self.usage["prompt_tokens"]
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "timeout_seconds": self.timeout,
+            "usage": {
+                **self.usage,
+                "cached_ratio": round(self.usage["cached_tokens"] / prompt_tokens, 3) if prompt_tokens else 0.0
+            }
+        }
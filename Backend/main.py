@@ -24,19 +24,34 @@
 
 
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import os
 from openai import OpenAI
 from dotenv import load_dotenv
 from typing import List
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
-from typing import Dict, List
+from typing import Dict, List, Optional
 import uuid
+import asyncio
+import threading
 from agent_system import PortfolioAgent
 import numpy as np
 from n8n_integration import router as n8n_router
+from job_queue import job_queue, QueueFullError, router as jobs_router
+from github_service import router as github_router
+from email_service import email_service, router as email_router
+from vector_index import VectorIndex, IVFIndex, MetadataIndex
+from llm_client import AsyncLLMClient, LLMTimeoutError
+from embedding_cache import EmbeddingCache
+from response_cache import ResponseCache
+from prompt_builder import PromptBuilder
+from conversation_summary import ConversationSummarizer
+from storage import (ConversationStore, SemanticStore, FileConversationStore,
+                     FileSemanticStore, create_stores)
 
 
 """
@@ -53,127 +68,265 @@ import numpy as np
 class EmbeddingMemory:
     """Semantic memory using embeddings"""
 
-    def __init__(self, storage_file: str = "semantic_memory.json"):
-        self.storage_file = storage_file
+    embedding_model = "text-embedding-3-small"
+
+    def __init__(self, store: SemanticStore = None, llm: AsyncLLMClient = None,
+                 cache: EmbeddingCache = None,
+                 max_memories: int = None, similarity_threshold: float = 0.7):
+        self.store = store or FileSemanticStore()
         self.client = OpenAI()
-        self.memories = self.load_memories()
+        self.llm = llm or AsyncLLMClient()
+        self.cache = cache or EmbeddingCache()
+        self.max_memories = max_memories or int(os.getenv("SEMANTIC_MEMORY_LIMIT", "5000"))
+        self.similarity_threshold = similarity_threshold
+        # Embeddings live in one float32 matrix; texts/metadata stay parallel lists
+        self.index = self._create_index()
+        # Session/tag/time postings so filtered searches only score matching rows
+        self.metadata_index = MetadataIndex()
+        self._saved_version = 0
+        self._unsaved_rows = 0
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._own_ids = set()  # Rows we appended that a refresh must not re-add
+        self.memories = {"texts": [], "metadata": []}
+        self.load_memories()
+    
+    def _create_index(self):
+        """Exact search by default; SEMANTIC_INDEX=ivf for large stores (IVF_NPROBE)"""
+        kind = os.getenv("SEMANTIC_INDEX", "flat").lower()
+        if kind == "ivf":
+            return IVFIndex(nprobe=int(os.getenv("IVF_NPROBE", "8")), path=self.store.index_file)
+        if kind != "flat":
+            raise ValueError(f"Unknown SEMANTIC_INDEX: {kind}")
+        return VectorIndex()
+    
+    def _save_index(self, added: int):
+        """Persist the IVF layout after (re)training and every 1000 new rows"""
+        if not isinstance(self.index, IVFIndex):
+            return
+        self._unsaved_rows += added
+        if self.index.version != self._saved_version or self._unsaved_rows >= 1000:
+            self.index.save()
+            self._saved_version = self.index.version
+            self._unsaved_rows = 0
     
     def load_memories(self):
-        """Load semantic memories from file"""
-        try:
-            with open(self.storage_file, 'r') as f:
-                return json.load(f)
-        except:
-            return {"embeddings": [], "texts": [], "metadata": []}
+        """Load the newest max_memories rows from the store into the index"""
+        self.refresh()
+        return self.memories
     
-    def save_memories(self):
-        """Save memories to file"""
-        with open(self.storage_file, 'w') as f:
-            json.dump(self.memories, f, indent=2)
+    def refresh(self):
+        """Pull rows other workers appended to a shared store since last load"""
+        if self._last_id and not self.store.shared:
+            return
+        
+        with self._lock:
+            ids, vectors, texts, metadata = self.store.load(
+                after_id=self._last_id, limit=self.max_memories
+            )
+            if not ids:
+                return
+            
+            fresh = [i for i, row_id in enumerate(ids) if row_id not in self._own_ids]
+            self._last_id = max(self._last_id, ids[-1])
+            self._own_ids = {i for i in self._own_ids if i > self._last_id}
+            if fresh:
+                self.index.add_batch(vectors[fresh])
+                self.memories["texts"].extend(texts[i] for i in fresh)
+                self.memories["metadata"].extend(metadata[i] for i in fresh)
+                for i in fresh:
+                    self.metadata_index.add(metadata[i])
+                self._trim_index()
+                self._save_index(len(fresh))
+    
+    def _trim_index(self):
+        """Keep only the newest max_memories entries in the index"""
+        overflow = len(self.index) - self.max_memories
+        if overflow > 0:
+            self.index.drop_oldest(overflow)
+            self.metadata_index.drop_oldest(overflow)
+            for key in ["texts", "metadata"]:
+                del self.memories[key][:overflow]
     
     def create_embedding(self, text: str):
-        """Convert text to embedding vector"""
+        """Convert text to embedding vector (cached by content hash)"""
+        cached = self.cache.get(self.embedding_model, text)
+        if cached is not None:
+            return cached
+        
         response = self.client.embeddings.create(
-            model="text-embedding-3-small",
+            model=self.embedding_model,
             input=text
         )
-        return response.data[0].embedding
+        return self.cache.set(self.embedding_model, text, response.data[0].embedding)
+    
+    async def acreate_embedding(self, text: str):
+        """Non-blocking create_embedding for async endpoints"""
+        cached = self.cache.get(self.embedding_model, text)
+        if cached is not None:
+            return cached
+        
+        embedding = await self.llm.embed(text, model=self.embedding_model)
+        return self.cache.set(self.embedding_model, text, embedding)
     
     def add_memory(self, text: str, metadata: dict = None):
         """Add text with embedding to memory"""
-        embedding = self.create_embedding(text)
-        
-        self.memories["embeddings"].append(embedding)
-        self.memories["texts"].append(text)
-        self.memories["metadata"].append(metadata or {})
-        
-        # Keep only last 50 memories
-        if len(self.memories["texts"]) > 50:
-            for key in ["embeddings", "texts", "metadata"]:
-                self.memories[key] = self.memories[key][-50:]
-        
-        self.save_memories()
+        self._insert(text, self.create_embedding(text), metadata)
+    
+    async def aadd_memory(self, text: str, metadata: dict = None):
+        """Non-blocking add_memory: awaits the embedding, stores off the event loop"""
+        embedding = await self.acreate_embedding(text)
+        await run_in_threadpool(self._insert, text, embedding, metadata)
     
-    def find_similar(self, query: str, top_k: int = 3):
-        """Find most similar memories to query"""
-        if not self.memories["embeddings"]:
+    def _insert(self, text: str, embedding, metadata: dict = None):
+        """Append an already-embedded memory to the index and the store"""
+        with self._lock:
+            position = self.index.add(embedding)
+            self.memories["texts"].append(text)
+            self.memories["metadata"].append(metadata or {})
+            self.metadata_index.add(metadata or {})
+            row_id = self.store.append(self.index.vectors[position], text, metadata or {})
+            if self.store.shared:
+                self._own_ids.add(row_id)
+            else:
+                self._last_id = row_id
+            
+            self._trim_index()
+            self.store.trim(self.max_memories)
+            self._save_index(1)
+    
+    def find_similar(self, query: str, top_k: int = 3, session: str = None,
+                     tags: List[str] = None, since: str = None, until: str = None):
+        """
+        Find most similar memories to query
+        - session / tags / since / until (ISO timestamps) restrict which
+          memories are scored at all
+        """
+        self.refresh()
+        filters = {"session": session, "tags": tags, "since": since, "until": until}
+        if not self._any_match(filters):
             return []
         
-        query_embedding = self.create_embedding(query)
-        similarities = []
-        
-        for i, emb in enumerate(self.memories["embeddings"]):
-            # Simple cosine similarity
-            sim = np.dot(query_embedding, emb) / (
-                np.linalg.norm(query_embedding) * np.linalg.norm(emb)
-            )
-            similarities.append((sim, i))
-        
-        # Sort by similarity (highest first)
-        similarities.sort(reverse=True, key=lambda x: x[0])
-        
-        # Return top matches
-        results = []
-        for sim, idx in similarities[:top_k]:
-            if sim > 0.7:  # Similarity threshold
-                results.append({
-                    "text": self.memories["texts"][idx],
-                    "similarity": float(sim),
-                    "metadata": self.memories["metadata"][idx]
-                })
+        return self._search(self.create_embedding(query), top_k, filters)
+    
+    async def afind_similar(self, query: str, top_k: int = 3, session: str = None,
+                            tags: List[str] = None, since: str = None, until: str = None):
+        """Non-blocking find_similar for async endpoints"""
+        await run_in_threadpool(self.refresh)
+        filters = {"session": session, "tags": tags, "since": since, "until": until}
+        # Takes the index lock, which inserts hold during disk writes and retraining swaps
+        if not await run_in_threadpool(self._any_match, filters):
+            return []  # Nothing matches the filters: skip the embedding call too
+        
+        embedding = await self.acreate_embedding(query)
+        # Scored under the lock in the threadpool, so inserts cannot reshape the index mid-search
+        return await run_in_threadpool(self._search, embedding, top_k, filters)
+    
+    def _candidates(self, filters: Dict) -> Optional[np.ndarray]:
+        """Positions passing the metadata filters (None: no filter given)"""
+        return self.metadata_index.select(
+            {"session": filters.get("session"), "tags": filters.get("tags")},
+            since=filters.get("since"), until=filters.get("until")
+        )
+    
+    def _any_match(self, filters: Dict) -> bool:
+        """Cheap pre-check before embedding the query; positions are not kept"""
+        with self._lock:
+            candidates = self._candidates(filters)
+            return bool(len(self.index)) and (candidates is None or bool(len(candidates)))
+    
+    def _search(self, query_embedding, top_k: int, filters: Dict = None):
+        """Score the query against the index and apply the threshold"""
+        # Same lock as _insert/refresh: they compact the matrix and trim the parallel lists.
+        # Candidates are resolved under it too, since a trim shifts every position
+        with self._lock:
+            candidates = self._candidates(filters) if filters else None
+            if candidates is not None and not len(candidates):
+                return []
+            
+            # One matrix-vector product + argpartition (over the probed lists with IVF,
+            # or over just the filtered rows)
+            results = []
+            for idx, sim in self.index.search(query_embedding, top_k, candidates=candidates):
+                if sim > self.similarity_threshold:
+                    results.append({
+                        "text": self.memories["texts"][idx],
+                        "similarity": sim,
+                        "metadata": self.memories["metadata"][idx]
+                    })
         
         return results
+    
+    def get_stats(self, sample: int = 5) -> Dict:
+        """Counts and newest texts, read from the store rather than RAM"""
+        return {
+            # File store defers compaction, so it may briefly hold trimmed rows
+            "total_memories": min(self.store.count(), self.max_memories),
+            "index": self.index.get_stats(),
+            "metadata_index": self.metadata_index.get_stats(),
+            "sample_memories": self.store.recent_texts(sample)
+        }
 
 
 class ConversationMemory:
-    """Simple file-based conversation memory"""
-    
-    def __init__(self, storage_file: str = "chat_memory.json"):
-        self.storage_file = storage_file
-        self.memories: Dict[str, List[Dict]] = self.load_memories()
+    """Conversation memory on top of a pluggable ConversationStore"""
     
-    def load_memories(self) -> Dict:
-        """Load memories from file"""
-        if os.path.exists(self.storage_file):
-            with open(self.storage_file, 'r') as f:
-                return json.load(f)
-        return {}
+    def __init__(self, store: ConversationStore = None, max_messages: int = None):
+        self.store = store or FileConversationStore()
+        # Older messages are folded into the session summary (CONVERSATION_WINDOW)
+        self.max_messages = max_messages or int(os.getenv("CONVERSATION_WINDOW", "6"))
     
-    def save_memories(self):
-        """Save memories to file"""
-        with open(self.storage_file, 'w') as f:
-            json.dump(self.memories, f, indent=2)
-    
-    def add_message(self, session_id: str, role: str, content: str):
-        """Add message to session memory"""
-        if session_id not in self.memories:
-            self.memories[session_id] = []
-        
-        self.memories[session_id].append({
+    def add_message(self, session_id: str, role: str, content: str) -> int:
+        """Add message to session memory, returns how many evicted messages await summary"""
+        return self.store.append_message(session_id, {
             "role": role,
             "content": content,
             "timestamp": datetime.now().isoformat()
-        })
-        
-        # Keep only last 12 messages (6 conversations)
-        if len(self.memories[session_id]) > 12:
-            self.memories[session_id] = self.memories[session_id][-12:]
-        
-        self.save_memories()
+        }, keep=self.max_messages)
     
     def get_session_history(self, session_id: str) -> List[Dict]:
-        """Get conversation history for session"""
-        return self.memories.get(session_id, [])
+        """Get conversation history for session (a copy, safe to keep across writes)"""
+        return list(self.store.get_messages(session_id))
+    
+    def get_message_count(self, session_id: str) -> int:
+        """Number of stored messages for session"""
+        return self.store.count_messages(session_id)
+    
+    def get_pending(self, session_id: str) -> List[Dict]:
+        """Messages pushed out of the window but not yet in the summary"""
+        return self.store.get_pending(session_id)
+    
+    def get_summary(self, session_id: str) -> Optional[str]:
+        """Rolling summary of messages older than the window, if any"""
+        summary = self.store.get_summary(session_id)
+        return summary["text"] if summary else None
 
 load_dotenv()
 
 app = FastAPI()
 
 app.include_router(n8n_router)
+app.include_router(jobs_router)
+app.include_router(github_router)
+app.include_router(email_router)
+
+# Async OpenAI client for the chat paths (OPENAI_MAX_CONCURRENCY, OPENAI_TIMEOUT)
+llm = AsyncLLMClient()
+
+# Initialize both memory systems (MEMORY_BACKEND=file|sqlite)
+conversation_store, semantic_store = create_stores()
+memory = ConversationMemory(conversation_store)
+# Evicted turns are summarized in the background, in batches
+# (SUMMARY_BATCH_MESSAGES, SUMMARY_MAX_DELAY, SUMMARY_MAX_TOKENS)
+summarizer = ConversationSummarizer(conversation_store, llm)
+embedding_memory = EmbeddingMemory(semantic_store, llm=llm)
+
+# Opt-in semantic cache for first-turn questions (RESPONSE_CACHE_ENABLED)
+response_cache = ResponseCache(embedding_memory)
 
-# Initialize both memory systems
-memory = ConversationMemory()
-embedding_memory = EmbeddingMemory()
+# Token-budgeted prompt assembly (PROMPT_TOKEN_BUDGET)
+chat_prompt = PromptBuilder("gpt-4o-mini", max_output_tokens=200)
+smart_prompt = PromptBuilder("gpt-4o-mini", max_output_tokens=250)
 
 # CORS middleware for frontend-backend communication
 app.add_middleware(
@@ -187,12 +340,28 @@ app.add_middleware(
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 portfolio_context = os.getenv("PORTFOLIO_CONTEXT", "")
 
+# Shared by both chat endpoints and never varies per request, so the provider
+# can serve it from its prompt cache; volatile content goes after it
+SYSTEM_PROMPT = f"""You are an AI portfolio assistant having a conversation with a visitor to the portfolio.
+
+Instructions:
+1. Answer based on the current query and any memories provided
+2. If memories are relevant, reference them naturally
+3. Keep responses conversational and helpful
+
+Portfolio context:
+{portfolio_context}"""
+
 # Initialize agent (add after existing client initialization)
 agent = PortfolioAgent(client)
 
+# Agent tasks run on the background job queue (JOB_WORKERS, JOB_QUEUE_DEPTH)
+job_queue.register("agent_task", lambda payload: agent.execute_plan(payload["task"], payload.get("use_cache", True)))
+
 class Message(BaseModel):
     content: str
     conversation_history: List[dict] = []
+    stream: bool = False  # NDJSON token stream instead of one JSON reply
 
 class PortfolioInfo(BaseModel):
     skills: List[str]
@@ -217,55 +386,106 @@ def get_portfolio():
         "education": "3rd Semester CS Student"
     }
 
+@app.on_event("shutdown")
+async def flush_summaries():
+    """Summarize evicted turns this worker has waiting instead of leaving them to the next run"""
+    await summarizer.flush()
+
+async def remember(session_id: str, role: str, content: str):
+    """Store a message; anything it pushes out of the window gets summarized"""
+    pending = await run_in_threadpool(memory.add_message, session_id, role, content)
+    summarizer.schedule(session_id, pending)
+
+async def stream_reply(messages: List[dict], finish, cached_reply: str = None, **params):
+    """
+    NDJSON stream of a chat completion
+    - {"type": "token", "content": ...} per delta as it arrives
+    - {"type": "done", "reply": ..., **finish(reply, usage)} once persisted
+    - {"type": "error", "detail": ...} if the model call fails
+    A cached_reply is sent as a single token without calling the model.
+    """
+    parts = []
+    usage = {}
+    try:
+        if cached_reply is not None:
+            parts.append(cached_reply)
+            yield json.dumps({"type": "token", "content": cached_reply}) + "\n"
+        else:
+            async for delta in llm.chat_stream(messages=messages, on_usage=usage.update, **params):
+                parts.append(delta)
+                yield json.dumps({"type": "token", "content": delta}) + "\n"
+        
+        ai_reply = "".join(parts)
+        yield json.dumps({"type": "done", "reply": ai_reply, **await finish(ai_reply, usage or None)}) + "\n"
+    except Exception as e:
+        yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
 # Update the chat endpoint (replace existing /chat endpoint)
 @app.post("/chat")
 async def chat_with_memory(message: Message, session_id: str = "default"):
     """
     Enhanced chat with memory
     - Uses session_id to remember conversation context
-    - Includes last 6 exchanges in AI prompt
+    - Includes the summary of older turns plus the recent messages that fit
+      the prompt token budget
     """
     try:
-        # Get conversation history for this session
-        history = memory.get_session_history(session_id)
+        # Get conversation history and summary for this session
+        history, pending, summary = await asyncio.gather(
+            run_in_threadpool(memory.get_session_history, session_id),
+            run_in_threadpool(memory.get_pending, session_id),
+            run_in_threadpool(memory.get_summary, session_id)
+        )
+        first_turn = not history
+        # Evicted turns waiting for the next summary batch are still sent
+        history = pending + history
         
         # Add user message to memory
-        memory.add_message(session_id, "user", message.content)
-        
-        # Prepare messages for OpenAI with system prompt and history
-        system_prompt = f"""
-        You are an AI portfolio assistant. Context: {portfolio_context}
-        You're having a conversation with a visitor.
-        """
-        
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add conversation history (last 6 exchanges)
-        messages.extend(history[-6:]) if history else None
+        await remember(session_id, "user", message.content)
+        
+        # Prepare messages for OpenAI with the shared system prompt and history
+        system_prompt = SYSTEM_PROMPT
+        
+        params = {"model": "gpt-4o-mini", "max_tokens": 200, "temperature": 0.7}
+        
+        # System prompt, recent history and current message within the token budget
+        messages, prompt_stats = chat_prompt.build(system_prompt, message.content, history, summary=summary)
+        
+        # Near-duplicate first-turn questions can be answered from the response cache
+        fingerprint = ResponseCache.make_fingerprint(system_prompt, sorted(params.items()))
+        cached = await response_cache.lookup(message.content, fingerprint) if first_turn else None
+        
+        async def finish(ai_reply: str, usage: Dict = None) -> Dict:
+            # Add AI response to memory
+            await remember(session_id, "assistant", ai_reply)
+            if first_turn and cached is None:
+                await response_cache.store(message.content, ai_reply, fingerprint)
+            return {
+                "session_id": session_id,
+                "memory_count": await run_in_threadpool(memory.get_message_count, session_id),
+                "cached": cached is not None,
+                "prompt_tokens": prompt_stats["prompt_tokens"],
+                "usage": usage,
+                "status": "success"
+            }
         
-        # Add current message
-        messages.append({"role": "user", "content": message.content})
+        if message.stream:
+            return StreamingResponse(
+                stream_reply(messages, finish, cached["reply"] if cached else None, **params),
+                media_type="application/x-ndjson"
+            )
         
-        # Call OpenAI
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            max_tokens=200,
-            temperature=0.7
-        )
+        if cached:
+            return {"reply": cached["reply"], **await finish(cached["reply"])}
         
+        # Call OpenAI without blocking the event loop
+        response = await llm.chat(messages=messages, **params)
         ai_reply = response.choices[0].message.content
         
-        # Add AI response to memory
-        memory.add_message(session_id, "assistant", ai_reply)
-        
-        return {
-            "reply": ai_reply,
-            "session_id": session_id,
-            "memory_count": len(memory.get_session_history(session_id)),
-            "status": "success"
-        }
+        return {"reply": ai_reply, **await finish(ai_reply, llm.describe_usage(response.usage))}
         
+    except LLMTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -273,82 +493,84 @@ async def chat_with_memory(message: Message, session_id: str = "default"):
 @app.get("/memory/{session_id}")
 def get_memory(session_id: str):
     """Get conversation history for a session"""
+    messages = memory.get_session_history(session_id)
     return {
         "session_id": session_id,
-        "messages": memory.get_session_history(session_id),
-        "total_messages": len(memory.get_session_history(session_id))
+        "messages": messages,
+        "total_messages": len(messages),
+        "pending_summary": memory.get_pending(session_id),
+        "summary": conversation_store.get_summary(session_id)
     }
 
 # Add this new endpoint
 @app.post("/chat_smart")
-async def chat_smart(message: Message, session_id: str = "default"):
+async def chat_smart(message: Message, session_id: str = "default",
+                     memory_scope: str = "all", memory_days: Optional[int] = None):
     """
     Smart chat with both recent and semantic memory
-    - Recent: Last 6 messages
+    - Recent: Summary of older turns plus the last messages
     - Semantic: Related past conversations
+      (memory_scope=session: only this session's; memory_days: only the last N days)
+    All are sent once each, trimmed to the prompt token budget
     """
+    if memory_scope not in ("all", "session"):
+        raise HTTPException(status_code=400, detail="memory_scope must be 'all' or 'session'")
+    scope = {
+        "session": session_id if memory_scope == "session" else None,
+        "since": (datetime.now() - timedelta(days=memory_days)).isoformat() if memory_days else None
+    }
+    
     try:
-        # Get recent conversation history
-        recent_history = memory.get_session_history(session_id)
-        
-        # Get semantically related memories
-        semantic_memories = embedding_memory.find_similar(message.content)
-        
-        # Build enhanced system prompt with memories
-        system_prompt = f"""
-        You are an AI portfolio assistant. Context: {portfolio_context}
-        
-        Recent conversation:
-        {recent_history[-3:] if recent_history else "No recent conversation"}
-        
-        Relevant past memories:
-        {[m['text'][:100] + '...' for m in semantic_memories[:2]] if semantic_memories else "No relevant memories"}
-        
-        Instructions:
-        1. Answer based on current query and available memories
-        2. If memories are relevant, reference them naturally
-        3. Keep responses conversational and helpful
-        """
-        
-        # Prepare messages
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add recent conversation
-        if recent_history:
-            messages.extend(recent_history[-4:])
-        
-        # Add current message
-        messages.append({"role": "user", "content": message.content})
+        # Recent history, summary and semantically related memories, fetched concurrently
+        recent_history, pending, summary, semantic_memories = await asyncio.gather(
+            run_in_threadpool(memory.get_session_history, session_id),
+            run_in_threadpool(memory.get_pending, session_id),
+            run_in_threadpool(memory.get_summary, session_id),
+            embedding_memory.afind_similar(message.content, **scope)
+        )
+        # Evicted turns waiting for the next summary batch are still sent
+        recent_history = pending + recent_history
         
-        # Get AI response
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            max_tokens=250,
-            temperature=0.8
+        # Stable system prompt and summary first, then recent turns, then this request's memories
+        messages, prompt_stats = smart_prompt.build(
+            SYSTEM_PROMPT, message.content, recent_history,
+            memories=[m['text'] for m in semantic_memories], summary=summary
         )
         
-        ai_reply = response.choices[0].message.content
+        async def finish(ai_reply: str, usage: Dict = None) -> Dict:
+            # Store in both memory systems
+            await remember(session_id, "user", message.content)
+            await remember(session_id, "assistant", ai_reply)
+            
+            # Store important exchanges in semantic memory
+            if len(message.content) > 20:  # Only store substantive messages
+                await embedding_memory.aadd_memory(
+                    text=f"User: {message.content}\nAssistant: {ai_reply}",
+                    metadata={"session": session_id, "timestamp": datetime.now().isoformat()}
+                )
+            
+            return {
+                "session_id": session_id,
+                "recent_memory_count": await run_in_threadpool(memory.get_message_count, session_id),
+                "semantic_matches": len(semantic_memories),
+                "prompt_tokens": prompt_stats["prompt_tokens"],
+                "usage": usage,
+                "status": "success"
+            }
         
-        # Store in both memory systems
-        memory.add_message(session_id, "user", message.content)
-        memory.add_message(session_id, "assistant", ai_reply)
+        params = {"model": "gpt-4o-mini", "max_tokens": 250, "temperature": 0.8}
+        if message.stream:
+            return StreamingResponse(stream_reply(messages, finish, **params),
+                                     media_type="application/x-ndjson")
         
-        # Store important exchanges in semantic memory
-        if len(message.content) > 20:  # Only store substantive messages
-            embedding_memory.add_memory(
-                text=f"User: {message.content}\nAssistant: {ai_reply}",
-                metadata={"session": session_id, "timestamp": datetime.now().isoformat()}
-            )
+        # Get AI response without blocking the event loop
+        response = await llm.chat(messages=messages, **params)
+        ai_reply = response.choices[0].message.content
         
-        return {
-            "reply": ai_reply,
-            "session_id": session_id,
-            "recent_memory_count": len(memory.get_session_history(session_id)),
-            "semantic_matches": len(semantic_memories),
-            "status": "success"
-        }
+        return {"reply": ai_reply, **await finish(ai_reply, llm.describe_usage(response.usage))}
         
+    except LLMTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -356,23 +578,47 @@ async def chat_smart(message: Message, session_id: str = "default"):
 @app.get("/semantic_memories")
 def get_semantic_memories():
     """Get all semantic memories"""
+    return embedding_memory.get_stats(sample=5)
+
+@app.get("/metrics")
+def get_metrics():
+    """Cache and model-call counters (llm.usage.cached_ratio: prompt-cache hit share)"""
     return {
-        "total_memories": len(embedding_memory.memories["texts"]),
-        "sample_memories": embedding_memory.memories["texts"][-5:] if embedding_memory.memories["texts"] else []
+        "embedding_cache": embedding_memory.cache.get_stats(),
+        "response_cache": response_cache.get_stats(),
+        "job_queue": job_queue.get_stats(),
+        "agent_tool_cache": agent.tool_cache.get_stats(),
+        "conversation_summaries": summarizer.get_stats(),
+        "email_outbox": email_service.outbox.get_stats(),
+        "llm": llm.get_stats(),
+        "timestamp": datetime.now().isoformat()
     }
 
 
 # Add new endpoints
-@app.post("/agent/task")
+@app.post("/agent/task", status_code=202)
 async def execute_agent_task(task_request: dict):
-    """Execute a task using the AI agent"""
+    """
+    Queue a task for the AI agent
+    - Returns a job id immediately; poll GET /jobs/{job_id} for the result
+    - "use_cache": false re-runs model-backed tools instead of reusing results
+    """
     task = task_request.get("task", "")
     
     if not task:
         raise HTTPException(status_code=400, detail="No task provided")
     
-    result = agent.execute_plan(task)
-    return result
+    try:
+        job = job_queue.submit("agent_task", {"task": task, "use_cache": task_request.get("use_cache", True)})
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "task": task,
+        "status_url": f"/jobs/{job['job_id']}"
+    }
 
 @app.get("/agent/status")
 def get_agent_status():
@@ -403,8 +649,11 @@ def health_check():
         "timestamp": datetime.now().isoformat(),
         "endpoints": {
             "agent": "/agent/task",
+            "jobs": "/jobs",
             "chat": "/chat",
             "n8n": "/n8n",
+            "github": "/github/dashboard",
+            "email": "/email/logs",
             "health": "/health"
         }
     }        
\ No newline at end of file
@@ -3,10 +3,11 @@ N8N INTEGRATION - Day 6
 Creates webhooks for n8n to trigger agent tasks
 """
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from datetime import datetime, timedelta
-import asyncio
+from datetime import datetime
+from job_queue import job_queue, QueueFullError
+from scheduler import scheduler
 
 router = APIRouter(prefix="/n8n", tags=["automation"])
 
@@ -16,8 +17,8 @@ class N8NTrigger(BaseModel):
     task_description: str
     parameters: dict = {}
 
-# Store scheduled tasks (in production, use Redis/Database)
-scheduled_tasks = {}
+# Scheduled tasks live in the cron scheduler (persisted to scheduled_tasks.json)
+scheduled_tasks = scheduler.tasks
 
 @router.post("/webhook/{workflow_name}")
 async def n8n_webhook(workflow_name: str, payload: dict):
@@ -39,11 +40,22 @@ async def n8n_webhook(workflow_name: str, payload: dict):
     
     agent_task = workflows.get(workflow_name, task)
     
+    try:
+        job = job_queue.submit("agent_task", {
+            "task": agent_task,
+            "source": f"n8n:{workflow_name}",
+            "use_cache": payload.get("use_cache", True)
+        })
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
     # Return immediate acknowledgment
     return {
         "status": "triggered",
         "workflow": workflow_name,
         "task": agent_task,
+        "job_id": job["job_id"],
+        "status_url": f"/jobs/{job['job_id']}",
         "timestamp": datetime.now().isoformat(),
         "note": "Task queued for agent execution"
     }
@@ -54,17 +66,15 @@ async def schedule_agent_task(schedule: dict):
     Schedule recurring agent tasks
     Example: {"task": "Daily summary", "cron": "0 9 * * *", "timezone": "UTC"}
     """
-    # Validate cron format (simplified)
-    cron_parts = schedule.get("cron", "").split()
-    if len(cron_parts) != 5:
-        raise HTTPException(status_code=400, detail="Invalid cron format")
+    if not schedule.get("task"):
+        raise HTTPException(status_code=400, detail="No task provided")
     
     task_id = f"task_{datetime.now().timestamp()}"
-    scheduled_tasks[task_id] = {
-        **schedule,
-        "created": datetime.now().isoformat(),
-        "next_run": calculate_next_run(schedule["cron"])
-    }
+    try:
+        # Parses the cron expression and timezone; fires into the job queue
+        scheduler.add(task_id, schedule)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cron format: {e}")
     
     return {
         "task_id": task_id,
@@ -77,17 +87,18 @@ async def get_scheduled_tasks():
     """List all scheduled tasks"""
     return {
         "count": len(scheduled_tasks),
-        "tasks": scheduled_tasks
+        "tasks": scheduled_tasks,
+        "scheduler": scheduler.get_stats()
     }
 
+@router.delete("/schedule/{task_id}")
+async def delete_scheduled_task(task_id: str):
+    """Cancel a scheduled task"""
+    if not scheduler.remove(task_id):
+        raise HTTPException(status_code=404, detail="Scheduled task not found")
+    return {"task_id": task_id, "status": "cancelled"}
+
 # Helper to calculate next run from cron
-@staticmethod
-def calculate_next_run(cron_expression: str) -> str:
-    """Simplified next run calculation"""
-    # In production, use croniter library
-    # For demo, assume daily at 9 AM
-    now = datetime.now()
-    next_run = now.replace(hour=9, minute=0, second=0, microsecond=0)
-    if now.hour >= 9:
-        next_run += timedelta(days=1)
-    return next_run.isoformat()
\ No newline at end of file
+def calculate_next_run(cron_expression: str, timezone: str = None) -> str:
+    """Next run time (ISO format) for a 5-field cron expression"""
+    return scheduler.next_run(cron_expression, timezone).isoformat()
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""
+PROMPT BUILDER - Token-budgeted chat prompts
+Counts tokens locally (tiktoken when installed, ~4 chars/token otherwise)
+and fills a per-model budget by priority:
+system context > conversation summary > semantic memories > recent turns (newest first)
+Layout keeps the system prompt (and the summary, which only changes when a
+session is compacted) as an unchanged prefix so the provider's prompt cache
+can reuse it: [system, summary, ...turns, memories, user]
+"""
+
+import os
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # Optional: pip install tiktoken for exact counts
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+
+# Context window per model; the prompt budget never exceeds window - max_tokens
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+    "gpt-3.5-turbo": 16385,
+}
+
+_encodings: Dict[str, object] = {}
+
+
+class TokenCounter:
+    """Token counts for one model's tokenizer"""
+
+    # Role/formatting tokens the API adds around every message
+    MESSAGE_OVERHEAD = 4
+
+    def __init__(self, model: str):
+        self.model = model
+        self.encoding = self._load_encoding(model)
+        self.exact = self.encoding is not None
+
+    @staticmethod
+    def _load_encoding(model: str):
+        if tiktoken is None:
+            return None
+        if model not in _encodings:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("o200k_base")
+            except Exception:
+                _encodings[model] = None  # Encoding files unavailable (offline)
+        return _encodings[model]
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def count_message(self, message: Dict) -> int:
+        return self.count(message["content"]) + self.MESSAGE_OVERHEAD
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text to at most max_tokens, marking the cut"""
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            return self.encoding.decode(tokens[:max_tokens - 1]) + "…"
+        return text[:max(max_tokens - 1, 0) * 4] + "…"
+
+
+class PromptBuilder:
+    """Assemble chat messages that fit a token budget"""
+
+    def __init__(self, model: str, max_output_tokens: int = 0, budget: int = None,
+                 max_turn_tokens: int = 300, max_memory_tokens: int = 150,
+                 max_summary_tokens: int = 300):
+        self.model = model
+        self.counter = TokenCounter(model)
+        window = MODEL_CONTEXT_WINDOWS.get(model, 8192)
+        budget = budget or int(os.getenv("PROMPT_TOKEN_BUDGET", "2000"))
+        # Hard ceiling: only a message that cannot fit the context window is cut
+        self.max_prompt_tokens = window - max_output_tokens
+        self.budget = min(budget, self.max_prompt_tokens)
+        self.max_turn_tokens = max_turn_tokens  # Longer past turns are truncated
+        self.max_memory_tokens = max_memory_tokens
+        self.max_summary_tokens = max_summary_tokens
+
+    def build(self, system_prompt: str, user_message: str,
+              history: Sequence[Dict] = (), memories: Sequence[str] = (),
+              max_turns: Optional[int] = None, summary: Optional[str] = None,
+              memory_header: str = "Relevant past memories:",
+              summary_header: str = "Summary of the earlier conversation:") -> Tuple[List[Dict], Dict]:
+        """
+        Returns (messages, stats).
+        History is oldest first, memories best match first. The current user
+        message is dropped from the end of history if it is already there.
+        The current message is always sent whole (history, summary and
+        memories fill what is left of the budget); it is only truncated if
+        it would not fit the model's context window, which stats report.
+        A summary of older, no longer stored turns follows the system prompt.
+        Memories go in their own system message after the history, so the
+        leading system prompt stays byte-identical between requests.
+        """
+        count_message = self.counter.count_message
+        system_cost = count_message({"content": system_prompt})
+        user = {"role": "user", "content": user_message}
+        user_cost = count_message(user)
+        user_truncated = system_cost + user_cost > self.max_prompt_tokens
+        if user_truncated:
+            limit = self.max_prompt_tokens - system_cost - TokenCounter.MESSAGE_OVERHEAD
+            user["content"] = self.counter.truncate(user_message, limit)
+            user_cost = count_message(user)
+            logger.warning("User message truncated from %d to %d tokens to fit the %s context window",
+                           self.counter.count(user_message), user_cost - TokenCounter.MESSAGE_OVERHEAD, self.model)
+        # May go negative for a long message: then nothing optional is added
+        remaining = self.budget - system_cost - user_cost
+
+        summary_message = None
+        if summary:
+            summary_message = {
+                "role": "system",
+                "content": f"{summary_header}\n{self.counter.truncate(summary, self.max_summary_tokens)}"
+            }
+            cost = count_message(summary_message)
+            if cost <= remaining:
+                remaining -= cost
+            else:
+                summary_message = None
+
+        turns = [{"role": m["role"], "content": m["content"]} for m in history]
+        if turns and turns[-1] == {"role": "user", "content": user_message}:
+            turns.pop()
+        if max_turns is not None:
+            turns = turns[-max_turns:] if max_turns > 0 else []
+
+        # Memories ("User: ...\nAssistant: ...") that only repeat turns we send add nothing
+        sent = {turn["content"] for turn in turns}
+        header = f"{memory_header}\n"
+        memory_lines = []
+        for text in memories:
+            if all(part.split(": ", 1)[-1] in sent for part in text.split("\n")):
+                continue
+            line = f"- {self.counter.truncate(text, self.max_memory_tokens)}"
+            cost = self.counter.count(line) + 1
+            if not memory_lines:
+                cost += self.counter.count(header) + self.counter.MESSAGE_OVERHEAD
+            if cost > remaining:
+                break
+            memory_lines.append(line)
+            remaining -= cost
+
+        # Newest turns first until the budget runs out
+        kept: List[Dict] = []
+        for turn in reversed(turns):
+            turn = {"role": turn["role"], "content": self.counter.truncate(turn["content"], self.max_turn_tokens)}
+            cost = count_message(turn)
+            if cost > remaining:
+                break
+            kept.append(turn)
+            remaining -= cost
+        kept.reverse()
+
+        messages = [{"role": "system", "content": system_prompt}]
+        if summary_message:
+            messages.append(summary_message)
+        messages.extend(kept)
+        if memory_lines:
+            messages.append({"role": "system", "content": header + "\n".join(memory_lines)})
+        messages.append(user)
+        stats = {
+            "prompt_tokens": self.budget - remaining,
+            "budget": self.budget,
+            "user_truncated": user_truncated,
+            "history_turns": len(kept),
+            "summary": summary_message is not None,
+            "memories": len(memory_lines),
+            "exact_count": self.counter.exact
+        }
+        return messages, stats
@@ -0,0 +1,109 @@
+"""
+RESPONSE CACHE - Semantic cache for first-turn portfolio questions
+Reuses EmbeddingMemory's embeddings (and its embedding cache) plus a
+VectorIndex so near-duplicate questions are answered without a model call
+- Opt-in: RESPONSE_CACHE_ENABLED=true
+- Entries expire after RESPONSE_CACHE_TTL seconds
+- Everything is dropped when the prompt context fingerprint changes
+"""
+
+import os
+import time
+import hashlib
+from typing import Dict, List, Optional
+
+from vector_index import VectorIndex
+
+
+class ResponseCache:
+    """Question embedding -> reply, matched by cosine similarity"""
+
+    def __init__(self, embedding_memory, enabled: bool = None, threshold: float = None,
+                 ttl: float = None, maxsize: int = None):
+        self.embedding_memory = embedding_memory
+        self.enabled = enabled if enabled is not None else \
+            os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.threshold = threshold or float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95"))
+        self.ttl = ttl or float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+        self.maxsize = maxsize or int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+
+        # Same TTL for every entry, so the oldest rows always expire first
+        self.index = VectorIndex()
+        self.entries: List[Dict] = []
+        self.fingerprint: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_fingerprint(*parts) -> str:
+        """Hash of everything that shapes an answer (context, model, params)"""
+        return hashlib.sha256("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    def clear(self):
+        self.index.clear()
+        self.entries = []
+
+    def _evict(self, fingerprint: str):
+        """Drop expired entries, or everything if the context changed"""
+        if fingerprint != self.fingerprint:
+            self.clear()
+            self.fingerprint = fingerprint
+            return
+
+        now = time.monotonic()
+        expired = 0
+        while expired < len(self.entries) and self.entries[expired]["expires"] <= now:
+            expired += 1
+        if expired:
+            self.index.drop_oldest(expired)
+            del self.entries[:expired]
+
+    async def lookup(self, question: str, fingerprint: str) -> Optional[Dict]:
+        """Cached reply for a near-duplicate question, or None"""
+        if not self.enabled:
+            return None
+
+        self._evict(fingerprint)
+        if not self.entries:
+            self.misses += 1
+            return None
+
+        embedding = await self.embedding_memory.acreate_embedding(question)
+        matches = self.index.search(embedding, top_k=1)
+        if matches and matches[0][1] >= self.threshold:
+            idx, similarity = matches[0]
+            self.hits += 1
+            return {**self.entries[idx], "similarity": similarity}
+
+        self.misses += 1
+        return None
+
+    async def store(self, question: str, reply: str, fingerprint: str):
+        """Remember the reply to a first-turn question"""
+        if not self.enabled:
+            return
+
+        # Served from the embedding cache when lookup already embedded it
+        embedding = await self.embedding_memory.acreate_embedding(question)
+        self._evict(fingerprint)
+        self.index.add(embedding)
+        self.entries.append({
+            "question": question,
+            "reply": reply,
+            "expires": time.monotonic() + self.ttl
+        })
+
+        overflow = len(self.entries) - self.maxsize
+        if overflow > 0:
+            self.index.drop_oldest(overflow)
+            del self.entries[:overflow]
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,286 @@
+"""
+CRON SCHEDULER - Recurring agent tasks
+Standard 5-field cron parser plus a heap-ordered timer
+- O(log n) insert / next-fire lookup, lazy deletion on cancel
+- Schedules persisted to JSON and reloaded on startup
+- Due tasks are dispatched to the background job queue
+"""
+
+import os
+import json
+import heapq
+import threading
+from datetime import datetime, timedelta, tzinfo
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from job_queue import job_queue
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+    ZoneInfoNotFoundError = KeyError
+
+
+class CronExpression:
+    """minute hour day-of-month month day-of-week (e.g. "*/15 9-17 * * mon-fri")"""
+
+    FIELDS = [
+        ("minute", 0, 59),
+        ("hour", 0, 23),
+        ("day", 1, 31),
+        ("month", 1, 12),
+        ("weekday", 0, 6),
+    ]
+    NAMES = {
+        "month": {m: i + 1 for i, m in enumerate(
+            ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"])},
+        "weekday": {d: i for i, d in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])},
+    }
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError("Cron expression needs exactly 5 fields")
+
+        parsed = {}
+        for text, (name, low, high) in zip(parts, self.FIELDS):
+            # Day-of-week accepts 7 as an alias for Sunday
+            values = self._parse_field(text, name, low, 7 if name == "weekday" else high)
+            if name == "weekday" and 7 in values:
+                values = (values - {7}) | {0}
+            parsed[name] = values
+
+        self.minutes: Set[int] = parsed["minute"]
+        self.hours: Set[int] = parsed["hour"]
+        self.days: Set[int] = parsed["day"]
+        self.months: Set[int] = parsed["month"]
+        self.weekdays: Set[int] = parsed["weekday"]
+        # Classic cron: if both day fields are restricted, either may match.
+        # As in Vixie cron, a field starting with "*" (including "*/n") is not restricted
+        self.day_restricted = not parts[2].startswith("*")
+        self.weekday_restricted = not parts[4].startswith("*")
+
+    def _value(self, token: str, name: str) -> int:
+        token = token.lower()
+        if token in self.NAMES.get(name, {}):
+            return self.NAMES[name][token]
+        return int(token)
+
+    def _parse_field(self, text: str, name: str, low: int, high: int) -> Set[int]:
+        values = set()
+        for item in text.split(","):
+            step = 1
+            if "/" in item:
+                item, step_text = item.split("/", 1)
+                step = int(step_text)
+                if step <= 0:
+                    raise ValueError(f"Invalid step in {name} field")
+
+            if item == "*":
+                start, end = low, high
+            elif "-" in item:
+                start_text, end_text = item.split("-", 1)
+                start, end = self._value(start_text, name), self._value(end_text, name)
+            else:
+                start = self._value(item, name)
+                end = high if step > 1 else start
+
+            if not (low <= start <= high and low <= end <= high and start <= end):
+                raise ValueError(f"Value out of range in {name} field: {item}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        weekday = (moment.weekday() + 1) % 7  # cron: Sunday = 0
+        day_ok = moment.day in self.days
+        weekday_ok = weekday in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First matching minute strictly after `moment` (same tzinfo)"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = candidate.year + candidate.month // 12, candidate.month % 12 + 1
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+
+        raise ValueError(f"Cron expression never fires: {self.expression}")
+
+
+def resolve_timezone(name: Optional[str]) -> Optional[tzinfo]:
+    """ZoneInfo for an IANA name; None means server local time"""
+    if not name or ZoneInfo is None:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {name}")
+
+
+class Scheduler:
+    """Heap of (next_fire_timestamp, task_id) served by one timer thread"""
+
+    def __init__(self, dispatch: Callable[[Dict], None] = None,
+                 storage_file: str = "scheduled_tasks.json"):
+        self.dispatch = dispatch
+        self.storage_file = storage_file
+        self.tasks: Dict[str, Dict] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._cron_cache: Dict[Tuple[str, Optional[str]], CronExpression] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.fired = 0
+        self._load()
+
+    def next_run(self, cron: str, timezone: Optional[str] = None,
+                 after: Optional[datetime] = None) -> datetime:
+        """Next fire time for an expression, timezone-aware when one is given"""
+        key = (cron, timezone)
+        expression = self._cron_cache.get(key)
+        if expression is None:
+            expression = self._cron_cache[key] = CronExpression(cron)
+        tz = resolve_timezone(timezone)
+        now = after or datetime.now(tz)
+        return expression.next_after(now.astimezone(tz) if tz else now)
+
+    def _load(self):
+        """Reload schedules; runs missed while down are skipped, not replayed"""
+        if not os.path.exists(self.storage_file):
+            return
+        try:
+            with open(self.storage_file, 'r') as f:
+                saved = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+
+        for task_id, task in saved.items():
+            try:
+                next_fire = self.next_run(task["cron"], task.get("timezone"))
+            except (KeyError, ValueError):
+                continue
+            task["next_run"] = next_fire.isoformat()
+            self.tasks[task_id] = task
+            heapq.heappush(self._heap, (next_fire.timestamp(), task_id))
+
+        if self.tasks:
+            self.start()
+
+    def _save(self):
+        tmp_file = self.storage_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.tasks, f, indent=2)
+        os.replace(tmp_file, self.storage_file)
+
+    def add(self, task_id: str, schedule: Dict) -> Dict:
+        """Register a schedule; raises ValueError for bad cron/timezone"""
+        cron, timezone = schedule.get("cron"), schedule.get("timezone")
+        if not isinstance(cron, str) or not cron.strip():
+            raise ValueError("A cron expression string is required")
+        if timezone is not None and not isinstance(timezone, str):
+            raise ValueError("Timezone must be an IANA name string")
+        next_fire = self.next_run(cron, timezone)
+        task = {
+            **schedule,
+            "created": datetime.now().isoformat(),
+            "next_run": next_fire.isoformat(),
+            "last_run": None,
+            "last_job_id": None,
+            "run_count": 0
+        }
+        with self._condition:
+            self.tasks[task_id] = task
+            heapq.heappush(self._heap, (next_fire.timestamp(), task_id))
+            self._save()
+            self._condition.notify()
+        self.start()
+        return task
+
+    def remove(self, task_id: str) -> bool:
+        """Cancel a schedule (its heap entry is skipped lazily)"""
+        with self._condition:
+            if self.tasks.pop(task_id, None) is None:
+                return False
+            self._save()
+            self._condition.notify()
+        return True
+
+    def start(self):
+        """Start the timer thread (idempotent)"""
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="cron-scheduler", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                due = self._pop_due()
+                if due is None:
+                    timeout = None
+                    if self._heap:
+                        timeout = max(self._heap[0][0] - datetime.now().timestamp(), 0)
+                    self._condition.wait(timeout)
+                    continue
+
+            task_id, task = due
+            try:
+                if self.dispatch:
+                    job_id = self.dispatch(task)
+                    task["last_job_id"] = job_id
+            except Exception as e:
+                task["last_error"] = str(e)
+            task["last_run"] = datetime.now().isoformat()
+            task["run_count"] = task.get("run_count", 0) + 1
+            self.fired += 1
+
+    def _pop_due(self) -> Optional[Tuple[str, Dict]]:
+        """Pop the earliest due task and push its next occurrence"""
+        now = datetime.now().timestamp()
+        while self._heap and self._heap[0][0] <= now:
+            fire_ts, task_id = heapq.heappop(self._heap)
+            task = self.tasks.get(task_id)
+            # Stale entry: task removed, or re-added with another time
+            if task is None or datetime.fromisoformat(task["next_run"]).timestamp() != fire_ts:
+                continue
+
+            next_fire = self.next_run(task["cron"], task.get("timezone"))
+            task["next_run"] = next_fire.isoformat()
+            heapq.heappush(self._heap, (next_fire.timestamp(), task_id))
+            return task_id, task
+        return None
+
+    def get_stats(self) -> Dict:
+        with self._condition:
+            upcoming = self._heap[0][0] if self._heap else None
+        return {
+            "scheduled": len(self.tasks),
+            "fired": self.fired,
+            "next_fire": datetime.fromtimestamp(upcoming).isoformat() if upcoming else None
+        }
+
+
+def dispatch_to_agent(task: Dict) -> str:
+    """Send a due schedule to the agent via the job queue, returns the job id"""
+    job = job_queue.submit("agent_task", {"task": task["task"], "source": "schedule"})
+    return job["job_id"]
+
+
+# Singleton instance
+scheduler = Scheduler(dispatch=dispatch_to_agent)
@@ -0,0 +1,526 @@
+"""
+MEMORY STORAGE - Pluggable backends
+Persistence for ConversationMemory and EmbeddingMemory
+- file: JSON snapshot + append-only logs, .npy vectors (single process)
+- sqlite: WAL-mode database shared by every uvicorn worker
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+class ConversationStore:
+    """Interface for per-session conversation history"""
+
+    def append_message(self, session_id: str, message: Dict, keep: int) -> int:
+        """
+        Store message; older messages beyond the newest `keep` leave the window
+        but stay stored as pending until a summary covering them is committed.
+        Returns the number of pending messages for the session.
+        """
+        raise NotImplementedError
+
+    def get_messages(self, session_id: str) -> List[Dict]:
+        """Messages in the window for a session, oldest first"""
+        raise NotImplementedError
+
+    def count_messages(self, session_id: str) -> int:
+        return len(self.get_messages(session_id))
+
+    def get_pending(self, session_id: str) -> List[Dict]:
+        """Messages evicted from the window but not yet summarized, oldest first"""
+        raise NotImplementedError
+
+    def get_summary(self, session_id: str) -> Optional[Dict]:
+        """Rolling summary of evicted messages ({"text", "messages", "updated"})"""
+        raise NotImplementedError
+
+    def commit_summary(self, session_id: str, summary: Dict, folded: int) -> bool:
+        """
+        Atomically store `summary` and delete the oldest `folded` pending
+        messages it covers. Compare-and-set: fails (returns False) unless the
+        stored summary still covers summary["messages"] - folded messages,
+        i.e. nobody else committed since it was read.
+        """
+        raise NotImplementedError
+
+
+class SemanticStore:
+    """Interface for embeddings plus their text and metadata"""
+
+    # True when other processes may append rows (readers should refresh)
+    shared = False
+    # Where an approximate index over these rows is persisted (None: not at all)
+    index_file: Optional[str] = None
+
+    def append(self, vector: np.ndarray, text: str, metadata: Dict) -> int:
+        """Store one normalized vector, returns its row id"""
+        raise NotImplementedError
+
+    def load(self, after_id: int = 0, limit: int = None) -> Tuple[List[int], np.ndarray, List[str], List[Dict]]:
+        """Newest `limit` rows with id > after_id, oldest first"""
+        raise NotImplementedError
+
+    def trim(self, keep: int):
+        """Drop everything but the newest `keep` rows (may be deferred)"""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def recent_texts(self, n: int) -> List[str]:
+        raise NotImplementedError
+
+
+# ---------------------------------------------------------------------------
+# File backend
+# ---------------------------------------------------------------------------
+
+class FileConversationStore(ConversationStore):
+    """
+    JSON snapshot + append-only message log, compacted periodically
+    Pending (evicted, unsummarized) messages stay at the front of a session's
+    list flagged "evicted"; a summary commit is one log line
+    """
+
+    def __init__(self, storage_file: str = "chat_memory.json", compact_every: int = 500):
+        self.storage_file = storage_file
+        self.log_file = os.path.splitext(storage_file)[0] + ".log"
+        self.summary_file = os.path.splitext(storage_file)[0] + "_summaries.json"
+        self.compact_every = compact_every  # Log entries before folding into the snapshot
+        self._lock = threading.Lock()
+        self._log_entries = 0
+        self.memories: Dict[str, List[Dict]] = {}
+        self.summaries: Dict[str, Dict] = {}
+        self._load()
+
+    def _load(self):
+        """Load the snapshot, then replay any messages logged after it"""
+        if os.path.exists(self.storage_file):
+            with open(self.storage_file, 'r') as f:
+                self.memories = json.load(f)
+        if os.path.exists(self.summary_file):
+            with open(self.summary_file, 'r') as f:
+                self.summaries = json.load(f)
+
+        torn = False
+        if os.path.exists(self.log_file):
+            with open(self.log_file, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        torn = True  # Torn write at the end of the log
+                        break
+                    session_id = entry.pop("session_id")
+                    if "fold" in entry:
+                        self._apply_fold(session_id, entry["fold"], entry["summary"])
+                    else:
+                        self._apply_append(session_id, entry, entry.pop("keep", None))
+                    self._log_entries += 1
+
+        if torn:
+            # Fold what was readable into the snapshot so new appends start clean
+            self.compact()
+
+    def compact(self):
+        """Write fresh snapshots atomically and truncate the log"""
+        for path, data in ((self.summary_file, self.summaries), (self.storage_file, self.memories)):
+            tmp_file = path + ".tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_file, path)
+        open(self.log_file, 'w').close()
+        self._log_entries = 0
+
+    @staticmethod
+    def _pending_count(session: List[Dict]) -> int:
+        count = 0
+        while count < len(session) and session[count].get("evicted"):
+            count += 1
+        return count
+
+    def _apply_append(self, session_id: str, message: Dict, keep: Optional[int]) -> int:
+        session = self.memories.setdefault(session_id, [])
+        session.append(message)
+        pending = self._pending_count(session)
+        if keep:
+            for i in range(pending, len(session) - keep):
+                session[i] = {**session[i], "evicted": True}
+            pending = max(pending, len(session) - keep)
+        return pending
+
+    def _apply_fold(self, session_id: str, folded: int, summary: Dict):
+        session = self.memories.get(session_id, [])
+        del session[:min(folded, self._pending_count(session))]
+        self.summaries[session_id] = summary
+
+    def _write_log(self, entry: Dict):
+        # Write cost is one line, not the whole store
+        with open(self.log_file, 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+        self._log_entries += 1
+        if self._log_entries >= self.compact_every:
+            self.compact()
+
+    def append_message(self, session_id: str, message: Dict, keep: int) -> int:
+        with self._lock:
+            pending = self._apply_append(session_id, message, keep)
+            self._write_log({"session_id": session_id, "keep": keep, **message})
+            return pending
+
+    def get_messages(self, session_id: str) -> List[Dict]:
+        session = self.memories.get(session_id, [])
+        return session[self._pending_count(session):]
+
+    def get_pending(self, session_id: str) -> List[Dict]:
+        session = self.memories.get(session_id, [])
+        return [{k: v for k, v in m.items() if k != "evicted"}
+                for m in session[:self._pending_count(session)]]
+
+    def get_summary(self, session_id: str) -> Optional[Dict]:
+        return self.summaries.get(session_id)
+
+    def commit_summary(self, session_id: str, summary: Dict, folded: int) -> bool:
+        with self._lock:
+            previous = self.summaries.get(session_id)
+            if (previous["messages"] if previous else 0) != summary["messages"] - folded:
+                return False
+            self._apply_fold(session_id, folded, summary)
+            # Summary and deletion land in the same log line
+            self._write_log({"session_id": session_id, "fold": folded, "summary": summary})
+            return True
+
+
+class FileSemanticStore(SemanticStore):
+    """Vectors in a memory-mapped .npy file, texts/metadata in a JSON-lines log"""
+
+    def __init__(self, storage_prefix: str = "semantic_memory"):
+        self.vector_file = f"{storage_prefix}.npy"
+        self.log_file = f"{storage_prefix}.jsonl"
+        self.legacy_file = f"{storage_prefix}.json"
+        self.index_file = f"{storage_prefix}.ivf.npz"
+        self._lock = threading.Lock()
+        self._texts: List[str] = []
+        self._metadata: List[Dict] = []
+        self._load()
+
+    def _load(self):
+        """Replay the metadata log and realign it with the vector file"""
+        if not os.path.exists(self.vector_file) and os.path.exists(self.legacy_file):
+            self._migrate_legacy_json()
+
+        torn = False
+        if os.path.exists(self.log_file):
+            with open(self.log_file, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        torn = True  # Torn write at the end of the log
+                        break
+                    self._texts.append(entry["text"])
+                    self._metadata.append(entry.get("metadata", {}))
+
+        rows = len(self._map_vectors())
+        if torn or rows != len(self._texts):
+            # Realign files after a crash
+            self._rewrite(min(rows, len(self._texts)))
+
+    def _map_vectors(self) -> np.ndarray:
+        """Memory-map the .npy vector file (rows derived from file size)"""
+        if not os.path.exists(self.vector_file):
+            return np.empty((0, 0), dtype=np.float32)
+
+        with open(self.vector_file, 'rb') as f:
+            np.lib.format.read_magic(f)
+            shape, _, _ = np.lib.format.read_array_header_1_0(f)
+            offset = f.tell()
+
+        dim = shape[1]
+        rows = (os.path.getsize(self.vector_file) - offset) // (4 * dim)
+        if rows == 0:
+            return np.empty((0, dim), dtype=np.float32)
+        return np.memmap(self.vector_file, dtype=np.float32, mode='r',
+                         offset=offset, shape=(rows, dim))
+
+    def _write_vector_header(self, f, rows: int, dim: int):
+        """(Re)write the .npy header; numpy pads it so the shape can grow in place"""
+        f.seek(0)
+        np.lib.format.write_array_header_1_0(
+            f, {"descr": "<f4", "fortran_order": False, "shape": (rows, dim)}
+        )
+
+    def _rewrite(self, keep: int):
+        """Compact both files down to the newest `keep` rows"""
+        vectors = self._map_vectors()
+        count = min(len(vectors), len(self._texts))
+        start = count - min(keep, count)
+
+        tmp_vectors = self.vector_file + ".tmp"
+        tmp_log = self.log_file + ".tmp"
+        with open(tmp_vectors, 'wb') as f:
+            np.save(f, np.ascontiguousarray(vectors[start:count]))
+        with open(tmp_log, 'w') as f:
+            for text, meta in zip(self._texts[start:count], self._metadata[start:count]):
+                f.write(json.dumps({"text": text, "metadata": meta}) + "\n")
+        del vectors
+
+        os.replace(tmp_vectors, self.vector_file)
+        os.replace(tmp_log, self.log_file)
+        self._texts = self._texts[start:count]
+        self._metadata = self._metadata[start:count]
+
+    def _migrate_legacy_json(self):
+        """One-time import of the old semantic_memory.json format"""
+        try:
+            with open(self.legacy_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+
+        embeddings = data.get("embeddings", [])
+        if embeddings:
+            vectors = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            np.save(self.vector_file, vectors / norms)
+            with open(self.log_file, 'w') as f:
+                for text, meta in zip(data.get("texts", [])[-len(embeddings):],
+                                      data.get("metadata", [])[-len(embeddings):]):
+                    f.write(json.dumps({"text": text, "metadata": meta}) + "\n")
+
+    def append(self, vector: np.ndarray, text: str, metadata: Dict) -> int:
+        """O(1) append: one vector row plus one log line"""
+        with self._lock:
+            if not os.path.exists(self.vector_file):
+                with open(self.vector_file, 'wb') as f:
+                    self._write_vector_header(f, 0, len(vector))
+
+            rows = len(self._texts) + 1
+            with open(self.vector_file, 'r+b') as f:
+                f.seek(0, os.SEEK_END)
+                f.write(np.asarray(vector, dtype="<f4").tobytes())
+                self._write_vector_header(f, rows, len(vector))
+
+            with open(self.log_file, 'a') as f:
+                f.write(json.dumps({"text": text, "metadata": metadata}) + "\n")
+            self._texts.append(text)
+            self._metadata.append(metadata)
+            return rows
+
+    def load(self, after_id: int = 0, limit: int = None) -> Tuple[List[int], np.ndarray, List[str], List[Dict]]:
+        vectors = self._map_vectors()
+        count = len(self._texts)
+        start = max(after_id, count - limit if limit else 0, 0)
+        # Copies only the requested rows out of the mapping, as float32
+        rows = np.array(vectors[start:count], dtype=np.float32)
+        return (list(range(start + 1, count + 1)), rows,
+                self._texts[start:count], self._metadata[start:count])
+
+    def trim(self, keep: int):
+        # Trimmed rows stay on disk until the files are twice the live size
+        with self._lock:
+            if len(self._texts) > 2 * keep:
+                self._rewrite(keep)
+
+    def count(self) -> int:
+        return len(self._texts)
+
+    def recent_texts(self, n: int) -> List[str]:
+        return self._texts[-n:] if n > 0 else []
+
+
+# ---------------------------------------------------------------------------
+# SQLite backend
+# ---------------------------------------------------------------------------
+
+class SQLiteDatabase:
+    """Thread-local connections to one WAL-mode database file"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        evicted INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id);
+    CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp);
+
+    CREATE TABLE IF NOT EXISTS session_summaries (
+        session_id TEXT PRIMARY KEY,
+        summary TEXT NOT NULL,
+        messages INTEGER NOT NULL,
+        updated TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS semantic_memories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT NOT NULL,
+        metadata TEXT NOT NULL,
+        embedding BLOB NOT NULL,
+        timestamp TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_semantic_timestamp ON semantic_memories(timestamp);
+    """
+
+    def __init__(self, path: str = "portfolio_memory.db"):
+        self.path = path
+        self._local = threading.local()
+        conn = self.connection()
+        conn.executescript(self.SCHEMA)
+        # Databases created before rolling summaries lack the evicted flag
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+        if "evicted" not in columns:
+            conn.execute("ALTER TABLE messages ADD COLUMN evicted INTEGER NOT NULL DEFAULT 0")
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+
+class SQLiteConversationStore(ConversationStore):
+    """One row per message, indexed by (session_id, id) and timestamp
+    Rows leaving the window are flagged evicted=1 and deleted only by the
+    transaction that commits the summary covering them
+    """
+
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    def append_message(self, session_id: str, message: Dict, keep: int) -> int:
+        conn = self.db.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                (session_id, message["role"], message["content"], message["timestamp"])
+            )
+            conn.execute(
+                """UPDATE messages SET evicted = 1 WHERE session_id = ? AND evicted = 0 AND id <= (
+                       SELECT id FROM messages WHERE session_id = ? AND evicted = 0
+                       ORDER BY id DESC LIMIT 1 OFFSET ?)""",
+                (session_id, session_id, keep)
+            )
+            return conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ? AND evicted = 1", (session_id,)
+            ).fetchone()[0]
+
+    def _select(self, session_id: str, evicted: int) -> List[Dict]:
+        rows = self.db.connection().execute(
+            "SELECT role, content, timestamp FROM messages WHERE session_id = ? AND evicted = ? ORDER BY id",
+            (session_id, evicted)
+        ).fetchall()
+        return [{"role": r, "content": c, "timestamp": t} for r, c, t in rows]
+
+    def get_messages(self, session_id: str) -> List[Dict]:
+        return self._select(session_id, 0)
+
+    def get_pending(self, session_id: str) -> List[Dict]:
+        return self._select(session_id, 1)
+
+    def count_messages(self, session_id: str) -> int:
+        return self.db.connection().execute(
+            "SELECT COUNT(*) FROM messages WHERE session_id = ? AND evicted = 0", (session_id,)
+        ).fetchone()[0]
+
+    def get_summary(self, session_id: str) -> Optional[Dict]:
+        row = self.db.connection().execute(
+            "SELECT summary, messages, updated FROM session_summaries WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+        return {"text": row[0], "messages": row[1], "updated": row[2]} if row else None
+
+    def commit_summary(self, session_id: str, summary: Dict, folded: int) -> bool:
+        conn = self.db.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT messages FROM session_summaries WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if (row[0] if row else 0) != summary["messages"] - folded:
+                return False  # Another worker summarized this session first
+            conn.execute(
+                """DELETE FROM messages WHERE id IN (
+                       SELECT id FROM messages WHERE session_id = ? AND evicted = 1
+                       ORDER BY id LIMIT ?)""",
+                (session_id, folded)
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO session_summaries (session_id, summary, messages, updated) VALUES (?, ?, ?, ?)",
+                (session_id, summary["text"], summary["messages"], summary["updated"])
+            )
+        return True
+
+
+class SQLiteSemanticStore(SemanticStore):
+    """Embeddings stored as float32 BLOBs next to their text and metadata"""
+
+    shared = True
+
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+        self.index_file = os.path.splitext(db.path)[0] + ".ivf.npz"
+
+    def append(self, vector: np.ndarray, text: str, metadata: Dict) -> int:
+        conn = self.db.connection()
+        cursor = conn.execute(
+            "INSERT INTO semantic_memories (text, metadata, embedding, timestamp) VALUES (?, ?, ?, ?)",
+            (text, json.dumps(metadata), np.asarray(vector, dtype="<f4").tobytes(),
+             metadata.get("timestamp"))
+        )
+        return cursor.lastrowid
+
+    def load(self, after_id: int = 0, limit: int = None) -> Tuple[List[int], np.ndarray, List[str], List[Dict]]:
+        rows = self.db.connection().execute(
+            """SELECT id, embedding, text, metadata FROM semantic_memories
+               WHERE id > ? ORDER BY id DESC LIMIT ?""",
+            (after_id, limit if limit else -1)
+        ).fetchall()
+        rows.reverse()
+        if not rows:
+            return [], np.empty((0, 0), dtype=np.float32), [], []
+
+        vectors = np.vstack([np.frombuffer(r[1], dtype="<f4") for r in rows])
+        return ([r[0] for r in rows], vectors,
+                [r[2] for r in rows], [json.loads(r[3]) for r in rows])
+
+    def trim(self, keep: int):
+        self.db.connection().execute(
+            """DELETE FROM semantic_memories WHERE id <= (
+                   SELECT id FROM semantic_memories ORDER BY id DESC LIMIT 1 OFFSET ?)""",
+            (keep,)
+        )
+
+    def count(self) -> int:
+        return self.db.connection().execute("SELECT COUNT(*) FROM semantic_memories").fetchone()[0]
+
+    def recent_texts(self, n: int) -> List[str]:
+        rows = self.db.connection().execute(
+            "SELECT text FROM semantic_memories ORDER BY id DESC LIMIT ?", (n,)
+        ).fetchall()
+        return [r[0] for r in reversed(rows)]
+
+
+def create_stores() -> Tuple[ConversationStore, SemanticStore]:
+    """Pick the backend from MEMORY_BACKEND ("file" or "sqlite")"""
+    backend = os.getenv("MEMORY_BACKEND", "file").lower()
+    if backend == "sqlite":
+        db = SQLiteDatabase(os.getenv("MEMORY_DB_PATH", "portfolio_memory.db"))
+        return SQLiteConversationStore(db), SQLiteSemanticStore(db)
+    if backend != "file":
+        raise ValueError(f"Unknown MEMORY_BACKEND: {backend}")
+    return FileConversationStore(), FileSemanticStore()
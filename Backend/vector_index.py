@@ -0,0 +1,517 @@
+"""
+VECTOR INDEX - Semantic Search Core
+Keeps embeddings in one contiguous float32 matrix with normalized rows
+so a query is a single matrix-vector product plus a partial top-k
+- VectorIndex: exact, scores every row
+- IVFIndex: approximate, scores only the rows near the query's centroids
+- MetadataIndex: narrows the rows to score by session, tags or time range
+"""
+
+import os
+import bisect
+import hashlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+class VectorIndex:
+    """Exact cosine-similarity index over a contiguous float32 matrix"""
+
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = 64):
+        self.dim = dim
+        self.initial_capacity = initial_capacity
+        self._matrix: Optional[np.ndarray] = None
+        # Live rows are _matrix[_start:_end]; dropping old rows only moves _start
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @staticmethod
+    def normalize(vectors) -> np.ndarray:
+        """Return float32 copy of vectors scaled to unit length"""
+        arr = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(arr, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return arr / norms
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the live (normalized) rows, oldest first"""
+        if self._matrix is None:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return self._matrix[self._start:self._end]
+
+    def _reserve(self, extra: int):
+        """Make room for `extra` rows at the end of the matrix"""
+        if self._matrix is None:
+            capacity = max(self.initial_capacity, extra)
+            self._matrix = np.empty((capacity, self.dim), dtype=np.float32)
+            return
+
+        capacity = self._matrix.shape[0]
+        if self._end + extra <= capacity:
+            return
+
+        live = len(self)
+        if live + extra <= capacity // 2:
+            # Plenty of dropped rows at the front: compact in place
+            self._matrix[:live] = self._matrix[self._start:self._end]
+        else:
+            new_capacity = max(capacity * 2, live + extra)
+            grown = np.empty((new_capacity, self.dim), dtype=np.float32)
+            grown[:live] = self._matrix[self._start:self._end]
+            self._matrix = grown
+        self._start, self._end = 0, live
+
+    def add(self, vector) -> int:
+        """Append one vector, returns its position"""
+        return self.add_batch(np.asarray(vector, dtype=np.float32)[None, :])
+
+    def add_batch(self, vectors) -> int:
+        """Append many vectors, returns position of the first one"""
+        rows = self.normalize(vectors)
+        if rows.ndim != 2:
+            raise ValueError("Expected a 2-D array of vectors")
+        if self.dim is None:
+            self.dim = rows.shape[1]
+        elif rows.shape[1] != self.dim:
+            raise ValueError(f"Vector dimension {rows.shape[1]} != index dimension {self.dim}")
+
+        first = len(self)
+        self._reserve(len(rows))
+        self._matrix[self._end:self._end + len(rows)] = rows
+        self._end += len(rows)
+        return first
+
+    def drop_oldest(self, count: int):
+        """Forget the `count` oldest vectors (O(1), space reclaimed lazily)"""
+        self._start = min(self._start + max(count, 0), self._end)
+
+    def clear(self):
+        """Remove every vector"""
+        self._matrix = None
+        self._start = self._end = 0
+
+    def search(self, query, top_k: int = 3, candidates: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Return (position, cosine similarity) pairs, best first
+
+        candidates restricts scoring to those positions (e.g. from a
+        MetadataIndex); the other rows are never touched.
+        """
+        count = len(self) if candidates is None else len(candidates)
+        if count == 0 or top_k <= 0:
+            return []
+
+        q = self.normalize(query)
+        scores = (self.vectors if candidates is None else self.vectors[candidates]) @ q
+
+        k = min(top_k, count)
+        if k < count:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(count)
+        top = top[np.argsort(-scores[top])]
+
+        if candidates is not None:
+            return [(int(candidates[i]), float(scores[i])) for i in top]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def get_stats(self) -> Dict:
+        return {"type": "flat", "rows": len(self)}
+
+
+class IVFIndex:
+    """Approximate cosine search over k-means inverted lists (IVF-flat)
+
+    Rows live in a VectorIndex, so positions and drop_oldest behave exactly
+    as in the exact index. Each row is also filed under its nearest
+    centroid and a query scores only the rows in the `nprobe` closest
+    lists: higher nprobe means better recall and slower queries, and
+    nprobe == nlist is exact. Search stays exact until `train_size` rows
+    exist; centroids are refitted whenever the index has grown 4x.
+    With a `path`, a layout saved there is restored instead of training.
+
+    Automatic (re)training runs k-means on a background thread over a copy
+    of the rows; the current lists keep serving until the next add_batch
+    or search swaps the result in (callers serialize those, so the swap
+    happens under their lock) and files rows added in the meantime.
+    """
+
+    def __init__(self, dim: Optional[int] = None, nlist: Optional[int] = None, nprobe: int = 8,
+                 train_size: int = 4096, initial_capacity: int = 64, path: Optional[str] = None):
+        self.flat = VectorIndex(dim, initial_capacity)
+        self.path = path
+        self.nlist = nlist  # None: ~sqrt(rows) at training time
+        self.nprobe = nprobe
+        self.train_size = train_size
+        self.centroids: Optional[np.ndarray] = None
+        # List members are absolute row ids (dropped rows + position)
+        self._lists: List[np.ndarray] = []
+        self._sizes: Optional[np.ndarray] = None
+        self._dropped = 0
+        self._stale = 0  # Dropped ids still sitting in lists
+        self._trainer: Optional[ThreadPoolExecutor] = None
+        self._training: Optional[Future] = None
+        self._training_base = 0  # Absolute id of the first row in the training snapshot
+        self.trained_rows = 0
+        self.version = 0  # Bumped on every (re)training
+
+    def __len__(self) -> int:
+        return len(self.flat)
+
+    normalize = staticmethod(VectorIndex.normalize)
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self.flat.dim
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self.flat.vectors
+
+    def add(self, vector) -> int:
+        """Append one vector, returns its position"""
+        return self.add_batch(np.asarray(vector, dtype=np.float32)[None, :])
+
+    def add_batch(self, vectors) -> int:
+        """Append many vectors, returns position of the first one"""
+        self._adopt()  # Before appending, so a swapped-in layout files these rows once
+        first = self.flat.add_batch(vectors)
+        count = len(self)
+        if self.centroids is None:
+            if count >= self.train_size and not (self._training or (self.path and self.load(self.path))):
+                self._train_in_background()
+            return first
+
+        rows = self.flat.vectors[first:]
+        self._file(np.arange(first, count, dtype=np.int64) + self._dropped, self._nearest(rows))
+        if count >= 4 * self.trained_rows:
+            self._train_in_background()
+        return first
+
+    def drop_oldest(self, count: int):
+        """Forget the `count` oldest vectors; their list entries are purged lazily"""
+        count = min(max(count, 0), len(self))
+        self.flat.drop_oldest(count)
+        self._dropped += count
+        self._stale += count
+        if self.centroids is not None and self._stale > len(self):
+            for c, members in enumerate(self._lists):
+                live = members[:self._sizes[c]]
+                live = live[live >= self._dropped]
+                members[:len(live)] = live
+                self._sizes[c] = len(live)
+            self._stale = 0
+
+    def clear(self):
+        """Remove every vector and the trained centroids"""
+        self.flat.clear()
+        self.centroids = None
+        self._lists, self._sizes = [], None
+        self._dropped = self._stale = self.trained_rows = 0
+        self._training = None  # An in-flight result is for rows that no longer exist
+
+    def _nearest(self, rows: np.ndarray, centroids: np.ndarray = None, batch: int = 8192) -> np.ndarray:
+        """Index of the most similar centroid per row"""
+        centroids = self.centroids if centroids is None else centroids
+        labels = np.empty(len(rows), dtype=np.int64)
+        for start in range(0, len(rows), batch):
+            labels[start:start + batch] = np.argmax(rows[start:start + batch] @ centroids.T, axis=1)
+        return labels
+
+    def _file(self, ids: np.ndarray, labels: np.ndarray):
+        """Append row ids to their lists, grouped so each list grows once"""
+        order = np.argsort(labels, kind="stable")
+        labels, ids = labels[order], ids[order]
+        starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+        for start, end in zip(starts, np.r_[starts[1:], len(labels)]):
+            c = int(labels[start])
+            size = self._sizes[c]
+            members = self._lists[c]
+            if size + end - start > len(members):
+                grown = np.empty(max(2 * len(members), size + end - start, 16), dtype=np.int64)
+                grown[:size] = members[:size]
+                members = self._lists[c] = grown
+            members[size:size + end - start] = ids[start:end]
+            self._sizes[c] = size + end - start
+
+    def _set_centroids(self, centroids: np.ndarray):
+        self.centroids = centroids
+        self._lists = [np.empty(0, dtype=np.int64) for _ in range(len(centroids))]
+        self._sizes = np.zeros(len(centroids), dtype=np.int64)
+        self._stale = 0
+
+    def _refile(self):
+        """Assign every live row to its nearest centroid"""
+        self._file(np.arange(len(self), dtype=np.int64) + self._dropped, self._nearest(self.flat.vectors))
+
+    def train(self, iterations: int = 10, seed: int = 0):
+        """(Re)fit centroids with spherical k-means on a sample, then refile every row"""
+        if len(self):
+            self._training = None  # Superseded
+            self._install(self._dropped, *self._fit(self.flat.vectors, iterations, seed))
+
+    def _train_in_background(self):
+        """Fit on a snapshot of the rows off the caller's thread; _adopt swaps it in"""
+        if self._training is not None:
+            return
+        if self._trainer is None:
+            self._trainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ivf-train")
+        # A copy: appends may compact or regrow the live matrix while k-means runs
+        self._training = self._trainer.submit(self._fit, self.flat.vectors.copy())
+        self._training_base = self._dropped
+
+    def _adopt(self):
+        """Swap in a finished background training, if any"""
+        future = self._training
+        if future is None or not future.done():
+            return
+        self._training = None
+        if future.exception() is None:
+            self._install(self._training_base, *future.result())
+        # On failure the old layout stays; the next add_batch tries again
+
+    def wait_for_training(self):
+        """Block until a background training finishes, then swap it in"""
+        if self._training is not None:
+            self._training.exception()  # Waits without raising; _adopt handles a failure
+            self._adopt()
+
+    def _install(self, base: int, centroids: np.ndarray, labels: np.ndarray):
+        """Replace the lists with a fit of the rows starting at absolute id `base`"""
+        self._set_centroids(centroids)
+        ids = np.arange(len(labels), dtype=np.int64) + base
+        live = ids >= self._dropped  # Rows dropped while training
+        self._file(ids[live], labels[live])
+        # Rows appended while training
+        caught_up = max(base + len(labels) - self._dropped, 0)
+        if caught_up < len(self):
+            rows = self.flat.vectors[caught_up:]
+            self._file(np.arange(caught_up, len(self), dtype=np.int64) + self._dropped, self._nearest(rows))
+        self.trained_rows = len(labels)
+        self.version += 1
+
+    def _fit(self, vectors: np.ndarray, iterations: int = 10, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """Spherical k-means on a sample of vectors; returns centroids and every row's label"""
+        count = len(vectors)
+        nlist = min(self.nlist or int(np.clip(np.sqrt(count), 8, 4096)), count)
+        rng = np.random.default_rng(seed)
+        sample = vectors[np.sort(rng.choice(count, min(count, nlist * 32), replace=False))]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = self._nearest(sample, centroids)
+            counts = np.bincount(labels, minlength=nlist)
+            filled = np.flatnonzero(counts)
+            order = np.argsort(labels, kind="stable")
+            starts = np.r_[0, np.cumsum(counts[filled])[:-1]]
+            centroids[filled] = np.add.reduceat(sample[order], starts, axis=0)
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                # Reseed empty clusters from random sample rows
+                centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+            centroids = self.normalize(centroids)
+
+        return centroids, self._nearest(vectors, centroids)
+
+    def search(self, query, top_k: int = 3, nprobe: Optional[int] = None,
+               candidates: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Return (position, cosine similarity) pairs, best first
+
+        With candidates (already a narrowed set) those rows are scored
+        exactly instead of probing lists.
+        """
+        self._adopt()
+        if len(self) == 0 or top_k <= 0:
+            return []
+
+        if candidates is not None or self.centroids is None:
+            return self.flat.search(query, top_k, candidates)
+
+        q = self.normalize(query)
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        probe = np.argpartition(-(self.centroids @ q), nprobe - 1)[:nprobe]
+        ids = np.concatenate([self._lists[c][:self._sizes[c]] for c in probe])
+        if self._stale:
+            ids = ids[ids >= self._dropped]
+        if len(ids) == 0:
+            return []
+
+        positions = ids - self._dropped
+        scores = self.flat.vectors[positions] @ q
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [(int(positions[i]), float(scores[i])) for i in top]
+
+    def _fingerprint(self) -> str:
+        """Identifies the live rows (count plus first/last vectors)"""
+        vectors = self.flat.vectors
+        if not len(vectors):
+            return ""
+        # Rounded: reloading from the store re-normalizes and may flip low bits
+        edges = np.round(vectors[[0, -1]], 4).tobytes()
+        return hashlib.sha1(edges + str(len(vectors)).encode()).hexdigest()
+
+    def save(self, path: Optional[str] = None):
+        """Write centroids and list membership (as live positions) to an .npz"""
+        path = path or self.path
+        if self.centroids is None or not path:
+            return
+        members = [m[:s] for m, s in zip(self._lists, self._sizes)]
+        members = [m[m >= self._dropped] - self._dropped for m in members]
+        tmp_file = path + ".tmp"
+        with open(tmp_file, 'wb') as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                positions=np.concatenate(members) if members else np.empty(0, dtype=np.int64),
+                counts=np.array([len(m) for m in members], dtype=np.int64),
+                trained_rows=self.trained_rows,
+                fingerprint=self._fingerprint()
+            )
+        os.replace(tmp_file, path)
+
+    def load(self, path: str) -> bool:
+        """Restore a saved layout for the rows already added.
+
+        Lists are reused when the rows match the ones saved; otherwise only
+        the centroids are kept and every row is refiled (no k-means rerun).
+        Returns False when there is nothing usable at `path`.
+        """
+        if not os.path.exists(path) or not len(self):
+            return False
+        try:
+            with np.load(path) as data:
+                saved = {key: data[key] for key in data.files}
+        except (OSError, ValueError, KeyError):
+            return False
+        if saved["centroids"].shape[1] != self.dim:
+            return False
+
+        self._set_centroids(saved["centroids"].astype(np.float32))
+        self.trained_rows = int(saved["trained_rows"])
+        if str(saved["fingerprint"]) == self._fingerprint():
+            counts = saved["counts"]
+            labels = np.repeat(np.arange(len(counts)), counts)
+            self._file(saved["positions"] + self._dropped, labels)
+        else:
+            self._refile()
+            self.version += 1  # Layout differs from the saved one
+        return True
+
+    def get_stats(self) -> Dict:
+        sizes = self._sizes if self._sizes is not None else np.zeros(0)
+        return {
+            "type": "ivf",
+            "rows": len(self),
+            "trained": self.centroids is not None,
+            "trained_rows": self.trained_rows,
+            "training": self._training is not None,
+            "nlist": len(sizes),
+            "nprobe": self.nprobe,
+            "largest_list": int(sizes.max()) if len(sizes) else 0
+        }
+
+
+class MetadataIndex:
+    """Inverted index from metadata to row positions, for filtering before scoring
+
+    Keyword fields (e.g. "session") and list fields (e.g. "tags") map each
+    value to the rows carrying it; ISO timestamps are kept sorted so a time
+    range is two bisects. Rows are numbered like VectorIndex positions and
+    follow its drop_oldest semantics; dropped rows are purged lazily.
+    """
+
+    def __init__(self, keyword_fields: Tuple[str, ...] = ("session",), list_fields: Tuple[str, ...] = ("tags",),
+                 time_field: str = "timestamp"):
+        self.keyword_fields = keyword_fields
+        self.list_fields = list_fields
+        self.time_field = time_field
+        # Postings hold absolute row ids (dropped rows + position), ascending
+        self._postings: Dict[Tuple[str, str], List[int]] = {}
+        self._times: List[str] = []
+        self._time_ids: List[int] = []
+        self._next_id = 0
+        self._dropped = 0
+        self._stale = 0
+
+    def __len__(self) -> int:
+        return self._next_id - self._dropped
+
+    def add(self, metadata: Dict) -> int:
+        """Index the metadata of the next row, returns its position"""
+        row_id = self._next_id
+        self._next_id += 1
+        for field in self.keyword_fields:
+            if metadata.get(field) is not None:
+                self._postings.setdefault((field, str(metadata[field])), []).append(row_id)
+        for field in self.list_fields:
+            for value in set(metadata.get(field) or ()):
+                self._postings.setdefault((field, str(value)), []).append(row_id)
+
+        timestamp = metadata.get(self.time_field)
+        if timestamp:
+            # Rows usually arrive in time order, so this is nearly always an append
+            at = bisect.bisect_right(self._times, timestamp)
+            self._times.insert(at, timestamp)
+            self._time_ids.insert(at, row_id)
+        return row_id - self._dropped
+
+    def drop_oldest(self, count: int):
+        """Forget the `count` oldest rows"""
+        count = min(max(count, 0), len(self))
+        self._dropped += count
+        self._stale += count
+        if self._stale > len(self):
+            for key in list(self._postings):
+                ids = self._postings[key]
+                del ids[:bisect.bisect_left(ids, self._dropped)]
+                if not ids:
+                    del self._postings[key]
+            live = [(t, i) for t, i in zip(self._times, self._time_ids) if i >= self._dropped]
+            self._times = [t for t, _ in live]
+            self._time_ids = [i for _, i in live]
+            self._stale = 0
+
+    def clear(self):
+        self._postings = {}
+        self._times, self._time_ids = [], []
+        self._next_id = self._dropped = self._stale = 0
+
+    def _live(self, ids) -> np.ndarray:
+        ids = np.asarray(ids, dtype=np.int64)
+        return ids[ids >= self._dropped] if self._stale else ids
+
+    def select(self, filters: Dict[str, object] = None, since: Optional[str] = None,
+               until: Optional[str] = None) -> Optional[np.ndarray]:
+        """Positions matching every filter, ascending; None when nothing is filtered
+
+        filters maps a field to a value, or for list fields to a list of
+        values that must all be present. since/until are ISO timestamps
+        (since inclusive, until exclusive).
+        """
+        candidates: Optional[np.ndarray] = None
+        for field, wanted in (filters or {}).items():
+            if wanted is None:
+                continue
+            values = wanted if field in self.list_fields and isinstance(wanted, (list, tuple, set)) else [wanted]
+            for value in values:
+                ids = self._live(self._postings.get((field, str(value)), []))
+                candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+                if not len(candidates):
+                    return candidates
+
+        if since is not None or until is not None:
+            lo = bisect.bisect_left(self._times, since) if since is not None else 0
+            hi = bisect.bisect_left(self._times, until) if until is not None else len(self._times)
+            ids = np.sort(self._live(self._time_ids[lo:hi]))
+            candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+
+        return None if candidates is None else candidates - self._dropped
+
+    def get_stats(self) -> Dict:
+        return {"rows": len(self), "keys": len(self._postings), "timestamped": len(self._times)}
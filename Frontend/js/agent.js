@@ -196,7 +196,14 @@ class PortfolioAgentUI {
                 body: JSON.stringify({task: task})
             });
             
-            const result = await response.json();
+            const job = await response.json();
+            if (!response.ok) {
+                throw new Error(job.detail || `Request failed (${response.status})`);
+            }
+            
+            // Task runs in the background: long-poll the job until it finishes
+            this.updateProgress(30, 'Task queued, agent working...');
+            const result = await this.waitForJob(job.job_id);
             
             // Display results
             this.displayResults(result);
@@ -218,6 +225,26 @@ class PortfolioAgentUI {
         }
     }
     
+    async waitForJob(jobId) {
+        while (true) {
+            const response = await fetch(`${this.backendUrl}/jobs/${jobId}?wait=30`);
+            const job = await response.json();
+            
+            if (!response.ok) {
+                throw new Error(job.detail || `Job lookup failed (${response.status})`);
+            }
+            if (job.status === 'completed') {
+                return job.result;
+            }
+            if (job.status === 'failed') {
+                throw new Error(job.error || 'Agent task failed');
+            }
+            if (job.status === 'running') {
+                this.updateProgress(60, 'Agent executing steps...');
+            }
+        }
+    }
+    
     updateProgress(percent, message) {
         const progressBar = document.getElementById('agentProgress');
         const statusText = document.getElementById('agentStatusText');
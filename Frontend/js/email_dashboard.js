@@ -230,7 +230,7 @@ class EmailDashboard {
     
     async sendPortfolioSummary() {
         try {
-            const response = await fetch(`${this.backendUrl}/email/summary`, {
+            const response = await fetch(`${this.backendUrl}/email/summary?wait=10`, {
                 method: 'POST',
                 headers: {'Content-Type': 'application/json'},
                 body: JSON.stringify({test: true})
@@ -239,7 +239,7 @@ class EmailDashboard {
             const result = await response.json();
             
             this.showNotification('success', 'Portfolio Summary Sent', 
-                `Email ${result.status === 'sent' ? 'sent successfully' : 'saved to file'}.`);
+                `Email ${result.status === 'sent' ? 'sent successfully' : result.status === 'saved_to_file' ? 'saved to file' : 'queued for delivery'}.`);
             
             // Refresh logs
             setTimeout(() => this.loadEmailLogs(), 1000);
@@ -262,7 +262,7 @@ class EmailDashboard {
                 results: agentStatus.recent_memory || []
             };
             
-            const response = await fetch(`${this.backendUrl}/email/agent-report`, {
+            const response = await fetch(`${this.backendUrl}/email/agent-report?wait=10`, {
                 method: 'POST',
                 headers: {'Content-Type': 'application/json'},
                 body: JSON.stringify(agentData)
@@ -271,7 +271,7 @@ class EmailDashboard {
             const result = await response.json();
             
             this.showNotification('success', 'Agent Report Sent', 
-                `Agent report ${result.status === 'sent' ? 'sent successfully' : 'saved to file'}.`);
+                `Agent report ${result.status === 'sent' ? 'sent successfully' : result.status === 'saved_to_file' ? 'saved to file' : 'queued for delivery'}.`);
             
             setTimeout(() => this.loadEmailLogs(), 1000);
             
@@ -283,7 +283,7 @@ class EmailDashboard {
     async testConnection() {
         try {
             // Test by sending a simple email
-            const response = await fetch(`${this.backendUrl}/email/summary`, {
+            const response = await fetch(`${this.backendUrl}/email/summary?wait=10`, {
                 method: 'POST',
                 headers: {'Content-Type': 'application/json'},
                 body: JSON.stringify({
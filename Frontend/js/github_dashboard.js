@@ -196,18 +196,17 @@ class GitHubDashboard {
     
     async loadGitHubData() {
         try {
-            // Load multiple data sources in parallel
-            const [profileResponse, reposResponse, contributionsResponse, languagesResponse] = await Promise.all([
-                fetch(`${this.backendUrl}/github/profile`),
-                fetch(`${this.backendUrl}/github/repos`),
-                fetch(`${this.backendUrl}/github/contributions`),
-                fetch(`${this.backendUrl}/github/languages`)
-            ]);
+            // Profile, repos, contributions and languages in one round-trip
+            const response = await fetch(`${this.backendUrl}/github/dashboard`);
+            if (!response.ok) {
+                throw new Error(`Dashboard request failed: ${response.status}`);
+            }
+            const dashboard = await response.json();
             
-            this.userData = await profileResponse.json();
-            this.repos = (await reposResponse.json()).repositories || [];
-            this.contributions = await contributionsResponse.json();
-            this.languages = await languagesResponse.json();
+            this.userData = dashboard.profile;
+            this.repos = dashboard.repositories || [];
+            this.contributions = dashboard.contributions;
+            this.languages = dashboard.languages;
             
             // Update UI
             this.updateStats();
@@ -460,7 +459,7 @@ class GitHubDashboard {
         
         // Send to backend for report generation
         try {
-            const response = await fetch(`${this.backendUrl}/email/summary`, {
+            const response = await fetch(`${this.backendUrl}/email/summary?wait=10`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
@@ -472,7 +471,7 @@ class GitHubDashboard {
             const result = await response.json();
             
             this.showNotification('success', 'Report Generated', 
-                `GitHub report ${result.status === 'sent' ? 'sent via email' : 'saved to file'}.`);
+                `GitHub report ${result.status === 'sent' ? 'sent via email' : result.status === 'saved_to_file' ? 'saved to file' : 'queued for delivery'}.`);
                 
         } catch (error) {
             this.showNotification('error', 'Report Generation Failed', error.message);
@@ -125,16 +125,13 @@ async sendMessage() {
             {
                 method: 'POST',
                 headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({content: message})
+                body: JSON.stringify({content: message, stream: true})
             }
         );
         
-        const data = await response.json();
-        this.hideTypingIndicator();
+        const data = await this.readReplyStream(response);
         
-        if (data.status === 'success') {
-            this.addMessage(data.reply, 'ai');
-            
+        if (data && data.status === 'success') {
             // Enhanced status display
             this.displayEnhancedMemoryStatus(data);
         }
@@ -145,6 +142,57 @@ async sendMessage() {
     }
 }
 
+// Render NDJSON tokens as they arrive; resolves with the final "done" event
+async readReplyStream(response) {
+    if (!response.ok || !response.body) {
+        throw new Error(`Request failed (${response.status})`);
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let contentEl = null;
+    let reply = '';
+    let final = null;
+    
+    const handle = (line) => {
+        if (!line.trim()) return;
+        const event = JSON.parse(line);
+        
+        if (event.type === 'token') {
+            if (!contentEl) {
+                // First token: swap the typing indicator for the reply bubble
+                this.hideTypingIndicator();
+                contentEl = this.addMessage('', 'ai').querySelector('.message-content');
+            }
+            reply += event.content;
+            contentEl.textContent = reply;
+            const chatHistory = document.getElementById('chatHistory');
+            chatHistory.scrollTop = chatHistory.scrollHeight;
+        } else if (event.type === 'done') {
+            final = event;
+        } else if (event.type === 'error') {
+            throw new Error(event.detail);
+        }
+    };
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.forEach(handle);
+    }
+    handle(buffer);
+    
+    this.hideTypingIndicator();
+    if (!contentEl && final) {
+        this.addMessage(final.reply, 'ai');
+    }
+    return final;
+}
+
 // New method for enhanced status
 displayEnhancedMemoryStatus(data) {
     let statusEl = document.getElementById('memoryStatus');
@@ -205,6 +253,7 @@ showMemoryModeNotification() {
         
         // Scroll to bottom
         chatHistory.scrollTop = chatHistory.scrollHeight;
+        return messageDiv;
     }
 
     showTypingIndicator() {